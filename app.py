@@ -1,12 +1,18 @@
+import click
 from flask import Flask
-import psycopg2
-from psycopg2 import pool
 import os
 from config import config
 from src.routes.home import home_bp
 from src.routes.movies import movies_bp
 from src.routes.actors import actors_bp
 from src.routes.comments import comments_bp
+from src.routes.images import images_bp
+from src.config.pool import BlockingConnectionPool
+from src.utils.cache import configure_caches
+from src.utils.json_provider import get_json_provider
+from src.utils.compression import init_compression
+from src.utils.image_variants import configure_variant_cache
+from src.utils.image_manifest import load_image_manifest
 
 def create_app(config_name=None):
     app = Flask(__name__)
@@ -15,23 +21,123 @@ def create_app(config_name=None):
     config_name = config_name or os.environ.get('FLASK_ENV', 'development')
     app.config.from_object(config[config_name])
     
+    # Fast JSON serialization and negotiated gzip/brotli compression
+    app.json = get_json_provider(app)
+    init_compression(app)
+    
     # Initialize database connection pool
     try:
-        app.db_pool = psycopg2.pool.SimpleConnectionPool(
+        app.db_pool = BlockingConnectionPool(
             app.config['DB_MIN_CONNECTIONS'],
             app.config['DB_MAX_CONNECTIONS'],
-            app.config['DATABASE_URL']
+            app.config['DATABASE_URL'],
+            timeout=app.config['DB_POOL_TIMEOUT'],
+            max_idle=app.config['DB_POOL_MAX_IDLE'],
+            validate_after=app.config['DB_POOL_VALIDATE_AFTER']
         )
         print(f"Database connection pool created successfully")
     except Exception as e:
         print(f"Error creating database pool: {e}")
         app.db_pool = None
     
+    # Size and TTL of the in-process entity caches
+    configure_caches(app.config)
+    configure_variant_cache(app.config)
+    load_image_manifest(app.config)
+    
+    # Evict cache entries changed by other processes (needs migration 0002)
+    if app.config['CACHE_LISTENER_ENABLED'] and app.db_pool is not None:
+        from src.utils.cache_listener import start_cache_listener
+        start_cache_listener(app.config['DATABASE_URL'])
+    
+    # Batch comment like/dislike increments instead of one UPDATE per click
+    if app.config['COMMENT_VOTE_COALESCING'] and app.db_pool is not None:
+        from src.utils.vote_buffer import start_comment_vote_buffer
+        start_comment_vote_buffer(app)
+    
     # Register blueprints
     app.register_blueprint(home_bp)
     app.register_blueprint(movies_bp, url_prefix='/movies')
     app.register_blueprint(actors_bp, url_prefix='/actors')
     app.register_blueprint(comments_bp, url_prefix='/comments')
+    app.register_blueprint(images_bp, url_prefix='/images')
+    
+    @app.cli.command('migrate')
+    def migrate_command():
+        """Apply pending schema migrations from the migrations/ folder"""
+        from src.config.migrations import run_migrations, get_schema_version
+        applied = run_migrations(app.config['DATABASE_URL'])
+        if not applied:
+            print("Database schema is up to date")
+        print(f"Schema version: {get_schema_version(app.config['DATABASE_URL'])}")
+    
+    @app.cli.command('rebuild-ratings')
+    def rebuild_ratings_command():
+        """Recompute movie_rating_stats from the comments table"""
+        from src.services.comments_service import rebuild_rating_stats
+        rebuilt, err = rebuild_rating_stats()
+        if err:
+            print(f"Error rebuilding rating statistics: {err}")
+            return
+        print(f"Rebuilt rating statistics for {rebuilt} movies")
+    
+    @app.cli.command('images-manifest')
+    @click.option('--report', 'report_path', default=None, help='Write the full audit report to this JSON file')
+    def images_manifest_command(report_path):
+        """Update the image manifest and report missing, orphaned and duplicate files"""
+        import json
+        from src.utils.image_manifest import ImageManifest, build_manifest, audit_manifest, set_image_manifest
+        from src.services.movie_service import get_image_references_db
+
+        manifest_path = app.config['IMAGE_MANIFEST_PATH']
+        manifest, counts = build_manifest(app.config['IMAGES_DIR'], ImageManifest.load(manifest_path))
+        manifest.save(manifest_path)
+        set_image_manifest(manifest)
+        print(f"Indexed {counts['files']} files ({counts['indexed']} new or changed, "
+              f"{counts['reused']} unchanged, {counts['removed']} removed) into {manifest_path}")
+
+        references, err = get_image_references_db()
+        if err:
+            print(f"Error reading image references, skipping the audit: {err}")
+            return
+        report = audit_manifest(manifest, references['movies'], references['platforms'])
+        print(f"Missing files: {len(report['missing'])}")
+        for item in report['missing'][:20]:
+            print(f"  {item['table']}.{item['column']} id={item['id']}: {item['file']}")
+        print(f"Orphaned files: {len(report['orphans'])}")
+        for name in report['orphans'][:20]:
+            print(f"  {name}")
+        print(f"Duplicate groups: {len(report['duplicates'])}")
+        for names in report['duplicates'][:20]:
+            print(f"  {', '.join(names)}")
+        if report_path:
+            with open(report_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            print(f"Full report written to {report_path}")
+    
+    @app.cli.command('load-data')
+    @click.option('--table', 'tables', multiple=True, help='Only load this table (repeatable)')
+    @click.option('--workers', type=int, default=None, help='Parallel database connections')
+    @click.option('--keep-removed', is_flag=True, help='Do not delete rows missing from the CSVs')
+    def load_data_command(tables, workers, keep_removed):
+        """Sync the catalog tables with the CSVs in LOAD_DATA_DIR without downtime"""
+        from src.config.data_loader import LoadError, load_data
+        try:
+            stats = load_data(
+                app.config['DATABASE_URL'],
+                data_dir=app.config['LOAD_DATA_DIR'],
+                tables=list(tables) or None,
+                workers=workers or app.config['LOAD_DATA_WORKERS'],
+                prune=not keep_removed
+            )
+        except LoadError as e:
+            print(f"Error loading data: {e}")
+            return
+        print(f"{'table':<16}{'rows':>9}{'rows/s':>10}{'inserted':>10}{'updated':>9}{'deleted':>9}{'seconds':>9}")
+        for row in stats:
+            seconds = row['copy_seconds'] + row['sync_seconds']
+            print(f"{row['table']:<16}{row['rows']:>9}{row['rows'] / seconds:>10.0f}{row['inserted']:>10}"
+                  f"{row['updated']:>9}{row['deleted']:>9}{seconds:>9.2f}")
     
     @app.teardown_appcontext
     def teardown_db(exception):
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 from dotenv import load_dotenv
 
@@ -22,6 +23,50 @@ class Config:
     # Connection pool settings
     DB_MIN_CONNECTIONS = int(os.environ.get('DB_MIN_CONNECTIONS', '1'))
     DB_MAX_CONNECTIONS = int(os.environ.get('DB_MAX_CONNECTIONS', '20'))
+    # Seconds to wait for a free connection before failing the request
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '5'))
+    # Idle connections older than this are reopened, ones older than
+    # DB_POOL_VALIDATE_AFTER are checked with SELECT 1 before reuse
+    DB_POOL_MAX_IDLE = float(os.environ.get('DB_POOL_MAX_IDLE', '600'))
+    DB_POOL_VALIDATE_AFTER = float(os.environ.get('DB_POOL_VALIDATE_AFTER', '30'))
+    
+    # Pagination settings for list endpoints
+    PAGE_SIZE_DEFAULT = int(os.environ.get('PAGE_SIZE_DEFAULT', '50'))
+    PAGE_SIZE_MAX = int(os.environ.get('PAGE_SIZE_MAX', '200'))
+    
+    # Rows fetched per round trip by server-side cursors in streaming responses
+    STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE', '500'))
+    
+    # Maximum number of records accepted by the /bulk endpoints
+    BULK_MAX_ROWS = int(os.environ.get('BULK_MAX_ROWS', '10000'))
+    
+    # Coalesce comment like/dislike clicks in memory and flush them in one
+    # UPDATE every COMMENT_VOTE_FLUSH_MS or COMMENT_VOTE_FLUSH_EVENTS clicks
+    COMMENT_VOTE_COALESCING = os.environ.get('COMMENT_VOTE_COALESCING', 'false').lower() == 'true'
+    COMMENT_VOTE_FLUSH_MS = int(os.environ.get('COMMENT_VOTE_FLUSH_MS', '200'))
+    COMMENT_VOTE_FLUSH_EVENTS = int(os.environ.get('COMMENT_VOTE_FLUSH_EVENTS', '500'))
+    
+    # In-process entity cache (movies, people, genres, platforms)
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', '2048'))
+    CACHE_TTL_SECONDS = int(os.environ.get('CACHE_TTL_SECONDS', '300'))
+    CACHE_LISTENER_ENABLED = os.environ.get('CACHE_LISTENER_ENABLED', 'true').lower() == 'true'
+    
+    # Poster, banner and platform logo files served under /images
+    IMAGES_DIR = os.environ.get('IMAGES_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'images')
+    # Index of IMAGES_DIR (size, dimensions, hash), built with `flask images-manifest`
+    IMAGE_MANIFEST_PATH = os.environ.get('IMAGE_MANIFEST_PATH') or os.path.join(IMAGES_DIR, '.manifest.json')
+    # Image names are content addressed, so clients may cache them for a year
+    IMAGE_MAX_AGE = int(os.environ.get('IMAGE_MAX_AGE', str(365 * 24 * 3600)))
+    # Resized variants (/images/<name>?w=154 or ?size=thumb) are kept on disk
+    # and evicted least recently used once they exceed IMAGE_VARIANT_MAX_BYTES
+    IMAGE_VARIANT_DIR = os.environ.get('IMAGE_VARIANT_DIR') or os.path.join(tempfile.gettempdir(), 'movem-image-variants')
+    IMAGE_VARIANT_MAX_BYTES = int(os.environ.get('IMAGE_VARIANT_MAX_BYTES', str(256 * 1024 * 1024)))
+    # Let a fronting nginx/Apache send the file (X-Sendfile) instead of the app
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', 'false').lower() == 'true'
+    
+    # CSV folder and parallel connections used by `flask load-data`
+    LOAD_DATA_DIR = os.environ.get('LOAD_DATA_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'init-db')
+    LOAD_DATA_WORKERS = int(os.environ.get('LOAD_DATA_WORKERS', '4'))
     
     # Construct DATABASE_URL from individual components
     DATABASE_URL = os.environ.get('DATABASE_URL') or f'postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
@@ -29,9 +74,16 @@ class Config:
     # Session configuration
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
     
-    # JSON configuration
-    JSON_SORT_KEYS = False
-    JSONIFY_PRETTYPRINT_REGULAR = True
+    # JSON serialization: 'orjson' (default) or 'stdlib'. Output is always
+    # compact with keys in column order; dates are ISO 8601
+    JSON_PROVIDER = os.environ.get('JSON_PROVIDER', 'orjson')
+    
+    # gzip/brotli response compression for JSON and text responses of at
+    # least COMPRESS_MIN_SIZE bytes (brotli needs the optional brotli package)
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'true').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', '1024'))
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', '4'))
+    COMPRESS_BR_QUALITY = int(os.environ.get('COMPRESS_BR_QUALITY', '4'))
 
 
 class DevelopmentConfig(Config):
@@ -50,6 +102,7 @@ class TestingConfig(Config):
     """Testing configuration"""
     DEBUG = True
     TESTING = True
+    CACHE_LISTENER_ENABLED = False
 
 
 # Configuration dictionary
@@ -0,0 +1,165 @@
+"""
+Adaptive concurrency for the TMDB metadata fetchers.
+
+AdaptiveLimiter caps the number of requests in flight and tunes that cap
+with AIMD: it grows by one after a full window of successes and halves on a
+429/503 or a network error. Other 5xx responses are retried without
+shrinking the window. A Retry-After from the server pauses all new requests
+until it expires. fetch_many() runs a list of items through the
+limiter, retries each one with its own attempt count and returns the items
+that finally failed, for the failure report.
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+
+from download_utils import DownloadError, RetryableError, lookup_fresh, request_json
+
+
+class AdaptiveLimiter:
+    def __init__(self, initial=4, minimum=1, maximum=32, default_pause=1.0):
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.default_pause = default_pause
+
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.successes = 0
+        self.last_decrease = 0.0
+        self.cond = asyncio.Condition()
+
+        self.peak = initial
+        self.decreases = 0
+        self.throttles = 0
+
+    async def __aenter__(self):
+        async with self.cond:
+            while True:
+                pause = self.paused_until - time.monotonic()
+                if pause > 0:
+                    try:
+                        await asyncio.wait_for(self.cond.wait(), pause)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                if self.in_flight < self.limit:
+                    self.in_flight += 1
+                    return self
+                await self.cond.wait()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self.cond:
+            self.in_flight -= 1
+            self.cond.notify_all()
+
+    def record_success(self):
+        """Additive increase: one more slot per window of `limit` successes"""
+        self.successes += 1
+        if self.successes >= self.limit and self.limit < self.maximum:
+            self.limit += 1
+            self.successes = 0
+            self.peak = max(self.peak, self.limit)
+
+    def record_failure(self, throttled=False, retry_after=None):
+        """Multiplicative decrease, at most once per second so one burst of errors counts once"""
+        now = time.monotonic()
+        self.successes = 0
+        if throttled:
+            self.throttles += 1
+            pause = retry_after if retry_after is not None else self.default_pause
+            self.paused_until = max(self.paused_until, now + pause)
+        elif retry_after is not None:
+            self.paused_until = max(self.paused_until, now + retry_after)
+
+        if now - self.last_decrease >= 1.0:
+            self.limit = max(self.minimum, self.limit // 2)
+            self.last_decrease = now
+            self.decreases += 1
+
+    def summary(self):
+        return (f"concurrency: limit {self.limit}, peak {self.peak}, "
+                f"{self.decreases} decreases, {self.throttles} throttled responses")
+
+
+async def fetch_many(session, keys, build_request, limiter, cache=None, max_attempts=5, progress=None):
+    """Fetch one JSON document per key through the limiter.
+
+    `build_request(key)` returns (url, params). Returns (results, failures):
+    results maps each successful key to its data (None for a 404) and
+    failures lists {'key', 'attempts', 'error'} for keys that never succeeded.
+    """
+    queue = asyncio.Queue()
+    for key in keys:
+        queue.put_nowait((key, 1))
+
+    results = {}
+    failures = []
+
+    async def fetch_one(key, attempt):
+        """Returns True once the key is finished, False if it was queued for another attempt"""
+        url, params = build_request(key)
+        hit, data = lookup_fresh(cache, url, params)
+        if hit:
+            results[key] = data
+            return True
+
+        try:
+            async with limiter:
+                data = await request_json(session, url, params, cache)
+        except RetryableError as e:
+            if e.congested:
+                limiter.record_failure(e.throttled, e.retry_after)
+            if attempt >= max_attempts:
+                failures.append({"key": key, "attempts": attempt, "error": str(e)})
+                return True
+            if not e.throttled:
+                # Throttled retries wait on the limiter's pause instead
+                await asyncio.sleep(min(30.0, 2 ** (attempt - 1)) * random.uniform(0.5, 1.0))
+            queue.put_nowait((key, attempt + 1))
+            return False
+        except DownloadError as e:
+            failures.append({"key": key, "attempts": attempt, "error": str(e)})
+            return True
+
+        limiter.record_success()
+        results[key] = data
+        return True
+
+    async def worker():
+        while True:
+            key, attempt = await queue.get()
+            try:
+                finished = await fetch_one(key, attempt)
+            except Exception as e:
+                # A dead worker would leave queue.join() waiting forever
+                failures.append({"key": key, "attempts": attempt, "error": f"{e.__class__.__name__}: {e}"})
+                finished = True
+            finally:
+                queue.task_done()
+            if finished and progress is not None:
+                progress(len(results) + len(failures))
+
+    workers = [asyncio.create_task(worker()) for _ in range(limiter.maximum)]
+    try:
+        await queue.join()
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+    return results, failures
+
+
+def write_failure_report(path, failures):
+    """Write failed keys with their attempt counts and last error; removes a stale report when all succeeded"""
+    if not failures:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(failures, f, indent=2, default=str)
@@ -1,66 +1,90 @@
+import asyncio
 import os
 import csv
-import requests
-import time
-
-SOURCE_CSV_FILE = 'init-db/db_platforms.csv'
-IMAGE_SAVE_DIR = 'images/platforms'
-IMAGE_BASE_URL = 'https://image.tmdb.org/t/p/w200'
-
-os.makedirs(IMAGE_SAVE_DIR, exist_ok=True)
-print(f"Images will be saved to: {IMAGE_SAVE_DIR}")
-
-downloaded_count = 0
-skipped_count = 0
-failed_count = 0
-
-try:
-    with open(SOURCE_CSV_FILE, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        
-        if 'logo_path' not in reader.fieldnames:
-            print(f"FATAL ERROR: 'logo_path' column not found in {SOURCE_CSV_FILE}")
-            exit(1)
-            
-        platform_rows = list(reader)
-        total_platforms = len(platform_rows)
-        print(f"Found {total_platforms} platforms in CSV file.")
-
-        for i, row in enumerate(platform_rows):
-            logo_path = row['logo_path']
-            platform_name = row['platform_name']
-            
-            if not logo_path or logo_path == 'N/A':
-                print(f"({i+1}/{total_platforms}) Skipping '{platform_name}' (No logo path)")
-                skipped_count += 1
-                continue
-
-            full_image_url = f"{IMAGE_BASE_URL}{logo_path}"
-            local_filename = os.path.basename(logo_path)
-            local_save_path = os.path.join(IMAGE_SAVE_DIR, local_filename)
-
-            if os.path.exists(local_save_path):
-                skipped_count += 1
-                continue
-            
-            try:
-                response = requests.get(full_image_url, timeout=10)
-                response.raise_for_status()
-
-                with open(local_save_path, 'wb') as img_file:
-                    img_file.write(response.content)
-                
-                print(f"({i+1}/{total_platforms}) SUCCESS: Downloaded {local_filename} (for {platform_name})")
-                downloaded_count += 1
-                
-                time.sleep(0.1) 
-
-            except requests.exceptions.RequestException as e:
-                print(f"({i+1}/{total_platforms}) ERROR downloading {full_image_url}: {e}")
-                failed_count += 1
-
-except FileNotFoundError:
-    print(f"FATAL ERROR: Source file not found at {SOURCE_CSV_FILE}")
-    print("Please run 'generate_platform_csvs.py' script first to create this file.")
-except Exception as e:
-    print(f"An unexpected error occurred: {e}")
\ No newline at end of file
+
+from download_utils import DownloadError, TokenBucket, download_file, new_session, remove_partial_files, run_workers
+
+"""
+Downloads the platform logos listed in init-db/db_platforms.csv.
+
+Logos are fetched CONCURRENCY at a time under a shared RATE_LIMIT (requests/second)
+and streamed to a temp file that is renamed into place when complete, so a logo
+file on disk is always whole and doubles as the checkpoint: a rerun only fetches
+the logos that are still missing.
+"""
+
+SOURCE_CSV_FILE = os.getenv('SOURCE_CSV_FILE', 'init-db/db_platforms.csv')
+IMAGE_SAVE_DIR = os.getenv('IMAGE_SAVE_DIR', 'images/platforms')
+IMAGE_BASE_URL = os.getenv('LOGO_BASE_URL', 'https://image.tmdb.org/t/p/w200')
+
+CONCURRENCY = int(os.getenv('CONCURRENCY', '8'))
+RATE_LIMIT = float(os.getenv('RATE_LIMIT', '10'))
+
+counts = {'downloaded': 0, 'skipped': 0, 'failed': 0}
+
+
+async def download_logo(session, bucket, i, total_platforms, row):
+    logo_path = row['logo_path']
+    platform_name = row['platform_name']
+    full_image_url = f"{IMAGE_BASE_URL}{logo_path}"
+    local_filename = os.path.basename(logo_path)
+    local_save_path = os.path.join(IMAGE_SAVE_DIR, local_filename)
+
+    try:
+        if await download_file(session, full_image_url, local_save_path, bucket):
+            print(f"({i+1}/{total_platforms}) SUCCESS: Downloaded {local_filename} (for {platform_name})")
+            counts['downloaded'] += 1
+        else:
+            counts['skipped'] += 1
+    except DownloadError as e:
+        print(f"({i+1}/{total_platforms}) ERROR downloading {full_image_url}: {e}")
+        counts['failed'] += 1
+
+
+async def main():
+    os.makedirs(IMAGE_SAVE_DIR, exist_ok=True)
+    remove_partial_files(IMAGE_SAVE_DIR)
+    print(f"Images will be saved to: {IMAGE_SAVE_DIR}")
+
+    try:
+        with open(SOURCE_CSV_FILE, 'r', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+
+            if 'logo_path' not in reader.fieldnames:
+                print(f"FATAL ERROR: 'logo_path' column not found in {SOURCE_CSV_FILE}")
+                exit(1)
+
+            platform_rows = list(reader)
+    except FileNotFoundError:
+        print(f"FATAL ERROR: Source file not found at {SOURCE_CSV_FILE}")
+        print("Please run 'generate_platform_csvs.py' script first to create this file.")
+        return
+
+    total_platforms = len(platform_rows)
+    print(f"Found {total_platforms} platforms in CSV file.")
+
+    jobs = []
+    for i, row in enumerate(platform_rows):
+        if not row['logo_path'] or row['logo_path'] == 'N/A':
+            print(f"({i+1}/{total_platforms}) Skipping '{row['platform_name']}' (No logo path)")
+            counts['skipped'] += 1
+            continue
+        jobs.append((i, row))
+
+    bucket = TokenBucket(RATE_LIMIT)
+    async with new_session(CONCURRENCY) as session:
+        failures = await run_workers(
+            jobs,
+            lambda job: download_logo(session, bucket, job[0], total_platforms, job[1]),
+            CONCURRENCY
+        )
+    counts['failed'] += len(failures)
+
+    print(f"Done: {counts['downloaded']} downloaded, {counts['skipped']} skipped, {counts['failed']} failed")
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(main())
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
@@ -0,0 +1,295 @@
+"""
+Shared helpers for the image download scripts: a token-bucket rate limiter,
+a JSON-lines checkpoint file, streaming downloads with atomic rename and a
+bounded pool of async workers. Needs aiohttp (pip install -r requirements.txt).
+"""
+
+import asyncio
+import json
+import os
+import time
+from email.utils import parsedate_to_datetime
+
+import aiohttp
+
+
+class TokenBucket:
+    """Allows `rate` requests per second on average, with bursts of up to `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class Checkpoint:
+    """Append-only record of finished items, one JSON object per line.
+
+    Every line is flushed as soon as an item finishes, so a crash loses at
+    most the items that were in flight. A torn last line is ignored on load.
+    """
+
+    def __init__(self, path, key="key"):
+        self.path = path
+        self.key = key
+        self.results = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.results[record[key]] = record
+        self.file = open(path, "a", encoding="utf-8")
+
+    def __contains__(self, item_key):
+        return item_key in self.results
+
+    def get(self, item_key):
+        return self.results.get(item_key)
+
+    def record(self, record):
+        self.results[record[self.key]] = record
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class DownloadError(Exception):
+    pass
+
+
+class RetryableError(DownloadError):
+    """A failure worth retrying: 429/5xx, a timeout or a dropped connection.
+
+    `status` is None for network errors, `retry_after` holds the server's
+    Retry-After in seconds when it sent one.
+    """
+
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+    @property
+    def throttled(self):
+        return self.status in THROTTLE_STATUSES
+
+    @property
+    def congested(self):
+        """Throttling or a network error, as opposed to an isolated server error"""
+        return self.status is None or self.throttled
+
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+THROTTLE_STATUSES = {429, 503}
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def cached_json(cached):
+    """(True, data) for a usable cache entry, (False, None) if its body isn't valid JSON.
+
+    Entries stored before bodies were checked may hold a truncated document.
+    """
+    if cached.status != 200:
+        return True, None
+    try:
+        return True, cached.json()
+    except ValueError:
+        return False, None
+
+
+def lookup_fresh(cache, url, params=None):
+    """(True, data) when the response cache has a fresh entry, else (False, None)"""
+    if cache is None:
+        return False, None
+    cached = cache.get(url, params)
+    if cached is None or not cache.is_fresh(cached):
+        return False, None
+    usable, data = cached_json(cached)
+    if not usable:
+        return False, None
+    cache.hits += 1
+    return True, data
+
+
+async def request_json(session, url, params=None, cache=None):
+    """One GET of a JSON document, revalidating a stale cache entry if there is one.
+
+    Returns None on 404. Raises RetryableError for 429/5xx, network errors
+    and a 200 whose body isn't valid JSON, DownloadError for any other status.
+    Only valid JSON is cached.
+    """
+    cached = cache.get(url, params) if cache else None
+    if cached is not None:
+        usable, cached_data = cached_json(cached)
+        if not usable:
+            # Fetched in full and overwritten below
+            cached = None
+    headers = cache.conditional_headers(cached) if cache else None
+    try:
+        async with session.get(url, params=params, headers=headers) as response:
+            if response.status == 304 and cached is not None:
+                cache.touch(url, params)
+                cache.revalidated += 1
+                return cached_data
+            if response.status in RETRY_STATUSES:
+                raise RetryableError(
+                    f"HTTP {response.status} for {url}",
+                    status=response.status,
+                    retry_after=parse_retry_after(response.headers.get("Retry-After"))
+                )
+            if response.status not in (200, 404):
+                raise DownloadError(f"HTTP {response.status} for {url}")
+            body = await response.read()
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        raise RetryableError(f"{e.__class__.__name__} for {url}: {e}")
+
+    data = None
+    if response.status == 200:
+        try:
+            data = json.loads(body)
+        except ValueError as e:
+            # Usually a truncated body or an HTML error page from a proxy
+            raise RetryableError(f"Invalid JSON for {url}: {e}", status=response.status)
+
+    if cache:
+        cache.misses += 1
+        cache.put(url, params, response.status, body,
+                  response.headers.get("ETag"), response.headers.get("Last-Modified"))
+    return data
+
+
+async def fetch_json(session, url, bucket=None, params=None, cache=None, retries=3):
+    """GET a JSON document with retries. Returns None on 404, raises DownloadError on other failures.
+
+    With a ResponseCache, fresh entries are returned without a request (and
+    without taking a rate limit token) and stale ones are revalidated.
+    """
+    hit, data = lookup_fresh(cache, url, params)
+    if hit:
+        return data
+
+    for attempt in range(retries + 1):
+        if bucket is not None:
+            await bucket.acquire()
+        try:
+            return await request_json(session, url, params, cache)
+        except RetryableError as e:
+            if attempt == retries:
+                raise
+            await asyncio.sleep(e.retry_after if e.retry_after is not None else 2 ** attempt)
+
+
+async def download_file(session, url, dest_path, bucket, retries=3, chunk_size=64 * 1024):
+    """Stream a file to a temp name next to dest_path and rename it into place.
+
+    Returns False if dest_path already exists. A complete file is only ever
+    visible under its final name, so its existence marks it as done.
+    """
+    if os.path.exists(dest_path):
+        return False
+
+    tmp_path = f"{dest_path}.part-{os.getpid()}"
+    for attempt in range(retries + 1):
+        await bucket.acquire()
+        try:
+            async with session.get(url) as response:
+                if response.status in RETRY_STATUSES and attempt < retries:
+                    await asyncio.sleep(2 ** attempt)
+                    continue
+                if response.status != 200:
+                    raise DownloadError(f"HTTP {response.status} for {url}")
+                with open(tmp_path, "wb") as f:
+                    async for chunk in response.content.iter_chunked(chunk_size):
+                        f.write(chunk)
+            os.replace(tmp_path, dest_path)
+            return True
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if attempt == retries:
+                raise DownloadError(f"{e.__class__.__name__} for {url}: {e}")
+            await asyncio.sleep(2 ** attempt)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def remove_partial_files(directory):
+    """Delete temp files left behind by a killed run"""
+    removed = 0
+    for name in os.listdir(directory):
+        if ".part-" in name:
+            os.remove(os.path.join(directory, name))
+            removed += 1
+    return removed
+
+
+async def run_workers(items, worker, concurrency):
+    """Run `await worker(item)` for every item with at most `concurrency` in flight.
+
+    An exception escaping worker() fails only that item; returns [(item, error), ...].
+    """
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    failures = []
+
+    async def consume():
+        while True:
+            item = await queue.get()
+            try:
+                await worker(item)
+            except Exception as e:
+                # A dead consumer would leave queue.join() waiting forever
+                print(f"Unexpected error processing {item!r}: {e.__class__.__name__}: {e}")
+                failures.append((item, e))
+            finally:
+                queue.task_done()
+
+    consumers = [asyncio.create_task(consume()) for _ in range(concurrency)]
+    try:
+        for item in items:
+            await queue.put(item)
+        await queue.join()
+    finally:
+        for consumer in consumers:
+            consumer.cancel()
+        await asyncio.gather(*consumers, return_exceptions=True)
+    return failures
+
+
+def new_session(concurrency, headers=None, timeout=30):
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    return aiohttp.ClientSession(
+        connector=connector,
+        headers=headers,
+        timeout=aiohttp.ClientTimeout(total=timeout)
+    )
@@ -2,67 +2,60 @@ import csv
 import os
 import asyncio
 import aiohttp
-import time
+
+from adaptive_fetch import AdaptiveLimiter, fetch_many, write_failure_report
+from response_cache import ResponseCache
 
 
 TMDB_API_KEY = os.getenv("TMDB_API_KEY")
-BASE_URL = "https://api.themoviedb.org/3/person/{}?language=en-US"
+BASE_URL = os.getenv("API_BASE_URL", "https://api.themoviedb.org/3") + "/person/{}"
 
 INPUT_FILE = "db_people.csv"
 OUTPUT_FILE = "filled_db_people.csv"
+FAILURE_REPORT = os.getenv("FAILURE_REPORT", "failed_db_people.json")
 
-# Simple throttle: 1 request every 3 seconds
-REQUEST_DELAY = 0.3
-
-
-async def fetch_person(session, person_id, max_retries=3):
-    """Fetch TMDB person data, one request every 3 seconds."""
-    url = BASE_URL.format(person_id)
-    params = {"api_key": TMDB_API_KEY}
-
-    for attempt in range(max_retries):
-        try:
-            async with session.get(url, params=params) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-
-                    # Wait 3 seconds before next request
-                    await asyncio.sleep(REQUEST_DELAY)
-
-                    return data
-                else:
-                    print(f"ID {person_id} -> HTTP {resp.status}")
-                    return None
-
-        except aiohttp.ClientError as e:
-            print(f"Network error for ID {person_id}: {e}")
+# Requests in flight start at CONCURRENCY_START and adapt between 1 and
+# CONCURRENCY_MAX: up while TMDB keeps answering, halved on 429/503 and network errors
+CONCURRENCY_START = int(os.getenv("CONCURRENCY_START", "4"))
+CONCURRENCY_MAX = int(os.getenv("CONCURRENCY_MAX", "32"))
+MAX_ATTEMPTS = int(os.getenv("MAX_ATTEMPTS", "5"))
 
-        # retry with exponential backoff
-        await asyncio.sleep(0.5 * (2 ** attempt))
 
-    print(f"Failed to fetch ID {person_id} after retries.")
-    return None
+def build_request(person_id):
+    return BASE_URL.format(person_id), {"api_key": TMDB_API_KEY, "language": "en-US"}
 
 
 async def process_all(actors):
-    """Fetch all actors sequentially, 1 request every 3 seconds."""
-    async with aiohttp.ClientSession(headers={"accept": "application/json"}) as session:
-        filled_rows = []
-
-        for row in actors:
-            person_id = row["id"]
-            print(f"Fetching {person_id}...")
-
-            data = await fetch_person(session, person_id)
+    """Fetch all actors with adaptive concurrency; returns the rows and the failed ids."""
+    limiter = AdaptiveLimiter(CONCURRENCY_START, maximum=CONCURRENCY_MAX)
+    cache = ResponseCache()
+    person_ids = [row["id"] for row in actors]
 
-            if data:
-                row["biography"] = data.get("biography", "")
-                row["birth_date"] = data.get("birthday", "")
-                row["photo_url"] = data.get("profile_path", "")
+    def progress(done):
+        if done % 100 == 0 or done == len(person_ids):
+            print(f"  > {done}/{len(person_ids)} people ({limiter.summary()})")
 
-            filled_rows.append(row)
-
-        return filled_rows
+    async with aiohttp.ClientSession(headers={"accept": "application/json"}) as session:
+        results, failures = await fetch_many(
+            session, person_ids, build_request, limiter,
+            cache=cache, max_attempts=MAX_ATTEMPTS, progress=progress
+        )
+
+    filled_rows = []
+    for row in actors:
+        data = results.get(row["id"])
+        if data:
+            row["biography"] = data.get("biography", "")
+            row["birth_date"] = data.get("birthday", "")
+            row["photo_url"] = data.get("profile_path", "")
+        filled_rows.append(row)
+
+    missing = sum(1 for person_id in person_ids if person_id in results and results[person_id] is None)
+    print(f"{len(results) - missing} people filled, {missing} not found on TMDB, {len(failures)} failed")
+    print(limiter.summary())
+    print(cache.summary())
+    cache.close()
+    return filled_rows, failures
 
 
 def main():
@@ -70,13 +63,17 @@ def main():
         reader = csv.DictReader(f)
         actors = list(reader)
 
-    filled_rows = asyncio.run(process_all(actors))
+    filled_rows, failures = asyncio.run(process_all(actors))
 
     with open(OUTPUT_FILE, "w", newline="", encoding="utf-8") as f:
         writer = csv.DictWriter(f, fieldnames=filled_rows[0].keys())
         writer.writeheader()
         writer.writerows(filled_rows)
 
+    write_failure_report(FAILURE_REPORT, failures)
+    if failures:
+        print(f"{len(failures)} people failed, see {FAILURE_REPORT}. Run again to retry them.")
+
     print(f"\nDone! Output saved to {OUTPUT_FILE}")
 
 
@@ -1,139 +1,120 @@
-import csv
-import json
-from datetime import datetime
-
-def create_people_csv(source_csv, output_csv='people.csv'):
-    """Create people.csv from the TMDB credits CSV."""
-    people_dict = {}  # Prevent duplicate persons
-    
-    with open(source_csv, 'r', encoding='utf-8') as file:
-        reader = csv.DictReader(file)
-        
-        for row in reader:
-            cast_json = row.get('cast', '[]')
-            crew_json = row.get('crew', '[]')
-            
-            try:
-                cast_list = json.loads(cast_json)
-            except json.JSONDecodeError:
-                cast_list = []
-            
-            try:
-                crew_list = json.loads(crew_json)
-            except json.JSONDecodeError:
-                crew_list = []
-            
-            # Cast (first 15 people per movie)
-            for cast_member in cast_list[:15]:
-                person_id = cast_member.get('id')
-                person_name = cast_member.get('name', '')
-                
-                if person_id and person_id not in people_dict:
-                    people_dict[person_id] = {
-                        'id': person_id,
-                        'name': person_name,
-                        'biography': '',
-                        'birth_date': '',
-                        'photo_url': '',
-                        'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    }
-            
-            # Directors only
-            for crew_member in crew_list:
-                if crew_member.get('job') == 'Director':
-                    person_id = crew_member.get('id')
-                    person_name = crew_member.get('name', '')
-                    
-                    if person_id and person_id not in people_dict:
-                        people_dict[person_id] = {
-                            'id': person_id,
-                            'name': person_name,
-                            'biography': '',
-                            'birth_date': '',
-                            'photo_url': '',
-                            'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        }
-    
-    with open(output_csv, 'w', newline='', encoding='utf-8') as file:
-        fieldnames = ['id', 'name', 'biography', 'birth_date', 'photo_url', 'created_at']
-        writer = csv.DictWriter(file, fieldnames=fieldnames)
-        
-        writer.writeheader()
-        for person in people_dict.values():
-            writer.writerow(person)
-    
-    print(f"Created {output_csv} with {len(people_dict)} people")
-    return len(people_dict)
-
-def create_movie_cast_csv(source_csv, output_csv='movie_cast.csv'):
-    """Create movie_cast.csv (actors + directors)."""
-    cast_entries = []
-    cast_id = 1
-    
-    with open(source_csv, 'r', encoding='utf-8') as file:
-        reader = csv.DictReader(file)
-        
-        for row in reader:
-            movie_id = row.get('movie_id', '')
-            
-            try:
-                cast_list = json.loads(row.get('cast', '[]'))
-            except json.JSONDecodeError:
-                cast_list = []
-            
-            try:
-                crew_list = json.loads(row.get('crew', '[]'))
-            except json.JSONDecodeError:
-                crew_list = []
-            
-            # Actors (first 15)
-            for cast_member in cast_list[:15]:
-                person_id = cast_member.get('id')
-                character_name = cast_member.get('character', '')
-                
-                if person_id:
-                    cast_entries.append({
-                        'id': cast_id,
-                        'movie_id': movie_id,
-                        'person_id': person_id,
-                        'role': 'Actor',
-                        'character_name': character_name
-                    })
-                    cast_id += 1
-            
-            # Director entries
-            for crew_member in crew_list:
-                if crew_member.get('job') == 'Director':
-                    person_id = crew_member.get('id')
-                    
-                    if person_id:
-                        cast_entries.append({
-                            'id': cast_id,
-                            'movie_id': movie_id,
-                            'person_id': person_id,
-                            'role': 'Director',
-                            'character_name': ''
-                        })
-                        cast_id += 1
-    
-    with open(output_csv, 'w', newline='', encoding='utf-8') as file:
-        fieldnames = ['id', 'movie_id', 'person_id', 'role', 'character_name']
-        writer = csv.DictWriter(file, fieldnames=fieldnames)
-        
-        writer.writeheader()
-        for entry in cast_entries:
-            writer.writerow(entry)
-    
-    print(f"Created {output_csv} with {len(cast_entries)} cast entries")
-    return len(cast_entries)
-
-def transform_csv_to_db_format(source_csv):
-    """Transform source TMDB CSV into normalized DB CSV files."""
-    print("Transforming CSV to database-compliant format...")
-    print("-" * 60)
-    
-    people_count = create_people_csv(source_csv)
-    cast_count = create_movie_cast_csv(source_csv)
-    
-if __name__ == "__main__":
-    transform_csv_to_db_format("tmdb_5000_credits.csv")
+import csv
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from itertools import islice
+from multiprocessing import Pool
+
+"""
+Builds people.csv and movie_cast.csv from the TMDB credits dump.
+
+The credits file is read once. Each row's cast/crew JSON is decoded into the
+few fields we keep (first 15 actors, directors) and both CSVs are written as
+rows come in, so memory stays flat apart from the set of people already seen.
+Decoding is the expensive part, so on large dumps it is spread over WORKERS
+processes (default: one per CPU); rows come back in file order, keeping the
+movie_cast ids and the people order identical to a sequential run.
+"""
+
+PEOPLE_FIELDS = ['id', 'name', 'biography', 'birth_date', 'photo_url', 'created_at']
+CAST_FIELDS = ['id', 'movie_id', 'person_id', 'role', 'character_name']
+
+MAX_ACTORS = 15
+WORKERS = int(os.getenv('WORKERS', str(os.cpu_count() or 1)))
+# Rows per task sent to a worker; larger batches amortise the pickling overhead
+BATCH_SIZE = int(os.getenv('BATCH_SIZE', '64'))
+# Below this file size the process pool costs more than it saves
+PARALLEL_MIN_BYTES = int(os.getenv('PARALLEL_MIN_BYTES', str(8 * 1024 * 1024)))
+
+# Credit blobs of big productions are larger than the csv module's default limit
+csv.field_size_limit(sys.maxsize)
+
+
+def _load_list(blob):
+    try:
+        return json.loads(blob or '[]')
+    except json.JSONDecodeError:
+        return []
+
+
+def parse_credits(movie_id, cast_json, crew_json):
+    """Reduce one credits row to (movie_id, [(person_id, name, role, character_name), ...])"""
+    credits = []
+    for cast_member in _load_list(cast_json)[:MAX_ACTORS]:
+        person_id = cast_member.get('id')
+        if person_id:
+            credits.append((person_id, cast_member.get('name', ''), 'Actor', cast_member.get('character', '')))
+
+    for crew_member in _load_list(crew_json):
+        if crew_member.get('job') == 'Director':
+            person_id = crew_member.get('id')
+            if person_id:
+                credits.append((person_id, crew_member.get('name', ''), 'Director', ''))
+    return movie_id, credits
+
+
+def _parse_batch(batch):
+    return [parse_credits(*row) for row in batch]
+
+
+def _read_batches(reader):
+    rows = ((row.get('movie_id', ''), row.get('cast'), row.get('crew')) for row in reader)
+    while True:
+        batch = list(islice(rows, BATCH_SIZE))
+        if not batch:
+            return
+        yield batch
+
+
+def _parsed_credits(reader, workers):
+    """Yield parsed rows in file order, decoding in a process pool when workers > 1"""
+    if workers <= 1:
+        for batch in _read_batches(reader):
+            yield from _parse_batch(batch)
+        return
+
+    with Pool(workers) as pool:
+        for parsed in pool.imap(_parse_batch, _read_batches(reader)):
+            yield from parsed
+
+
+def transform_csv_to_db_format(source_csv, people_csv='people.csv', cast_csv='movie_cast.csv', workers=None):
+    """Transform source TMDB CSV into normalized DB CSV files in a single pass."""
+    print("Transforming CSV to database-compliant format...")
+    print("-" * 60)
+
+    if workers is None:
+        workers = WORKERS if os.path.getsize(source_csv) >= PARALLEL_MIN_BYTES else 1
+
+    started = time.perf_counter()
+    created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    seen_people = set()
+    cast_id = 0
+
+    with open(source_csv, 'r', newline='', encoding='utf-8') as source, \
+            open(people_csv, 'w', newline='', encoding='utf-8') as people_file, \
+            open(cast_csv, 'w', newline='', encoding='utf-8') as cast_file:
+        people_writer = csv.writer(people_file)
+        cast_writer = csv.writer(cast_file)
+        people_writer.writerow(PEOPLE_FIELDS)
+        cast_writer.writerow(CAST_FIELDS)
+
+        for movie_id, credits in _parsed_credits(csv.DictReader(source), workers):
+            for person_id, name, role, character_name in credits:
+                if person_id not in seen_people:
+                    seen_people.add(person_id)
+                    people_writer.writerow([person_id, name, '', '', '', created_at])
+                cast_id += 1
+                cast_writer.writerow([cast_id, movie_id, person_id, role, character_name])
+
+    elapsed = time.perf_counter() - started
+    print(f"Created {people_csv} with {len(seen_people)} people")
+    print(f"Created {cast_csv} with {cast_id} cast entries")
+    print(f"Done in {elapsed:.2f}s using {workers} worker(s)")
+    return len(seen_people), cast_id
+
+
+if __name__ == "__main__":
+    transform_csv_to_db_format(os.getenv('SOURCE_CSV', 'tmdb_5000_credits.csv'))
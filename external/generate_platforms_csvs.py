@@ -1,39 +1,68 @@
 import os
-import time
-import requests 
+import asyncio
+import aiohttp
 import csv
 from dotenv import load_dotenv
 
-load_dotenv() 
+from adaptive_fetch import AdaptiveLimiter, fetch_many, write_failure_report
+from response_cache import ResponseCache
+
+load_dotenv()
 
 API_KEY = os.environ.get('TMDB_API_KEY')
-API_BASE_URL = "https://api.themoviedb.org/3"
+API_BASE_URL = os.environ.get('API_BASE_URL', "https://api.themoviedb.org/3")
+
+# Requests in flight adapt between 1 and CONCURRENCY_MAX (see adaptive_fetch.py)
+CONCURRENCY_START = int(os.environ.get('CONCURRENCY_START', '4'))
+CONCURRENCY_MAX = int(os.environ.get('CONCURRENCY_MAX', '32'))
+MAX_ATTEMPTS = int(os.environ.get('MAX_ATTEMPTS', '5'))
+FAILURE_REPORT = os.environ.get('FAILURE_REPORT', './init-db/failed_watch_providers.json')
 
 if not API_KEY:
     print("FATAL ERROR: TMDB_API_KEY .env dosyanızda bulunamadı.")
     exit(1)
 
-def fetch_watch_provider(movie_id):
-    try:
-        url = f"{API_BASE_URL}/movie/{movie_id}/watch/providers?api_key={API_KEY}"
-        response = requests.get(url, timeout=5)
-        response.raise_for_status()
-        
-        data = response.json()
-        providers = data.get('results', {}).get('US', {}).get('flatrate', [])
-        
-        if providers:
-            sorted_providers = sorted(providers, key=lambda p: p.get('display_priority', 99))
-            best_provider = sorted_providers[0] 
-            
-            return {
-                "name": best_provider.get('provider_name'),
-                "logo_path": best_provider.get('logo_path'),
-                "id": best_provider.get('provider_id')
-            }
-    except Exception:
-        pass
-    return None
+
+def build_request(movie_id):
+    return f"{API_BASE_URL}/movie/{movie_id}/watch/providers", {'api_key': API_KEY}
+
+
+def best_watch_provider(data):
+    """Highest priority US flatrate provider of a /watch/providers response, or None"""
+    if not data:
+        return None
+    providers = data.get('results', {}).get('US', {}).get('flatrate', [])
+    if not providers:
+        return None
+
+    sorted_providers = sorted(providers, key=lambda p: p.get('display_priority', 99))
+    best_provider = sorted_providers[0]
+    return {
+        "name": best_provider.get('provider_name'),
+        "logo_path": best_provider.get('logo_path'),
+        "id": best_provider.get('provider_id')
+    }
+
+
+async def fetch_watch_providers(movie_ids):
+    limiter = AdaptiveLimiter(CONCURRENCY_START, maximum=CONCURRENCY_MAX)
+    cache = ResponseCache()
+
+    def progress(done):
+        if done % 100 == 0:
+            print(f"  > Processed movie {done}/{len(movie_ids)}... ({limiter.summary()})")
+
+    async with aiohttp.ClientSession(headers={"accept": "application/json"}) as session:
+        results, failures = await fetch_many(
+            session, movie_ids, build_request, limiter,
+            cache=cache, max_attempts=MAX_ATTEMPTS, progress=progress
+        )
+
+    print(limiter.summary())
+    print(cache.summary())
+    cache.close()
+    return results, failures
+
 
 movies_csv_path = './init-db/db_movies.csv'
 unique_platforms = {}
@@ -46,28 +75,30 @@ try:
         reader = csv.DictReader(f)
         movie_ids = [row['id'] for row in reader]
 
-    print(f"Found {len(movie_ids)} movies. Starting API calls... (This will take a long time!)")
+    print(f"Found {len(movie_ids)} movies. Starting API calls...")
+
+    results, failures = asyncio.run(fetch_watch_providers(movie_ids))
 
-    for i, movie_id in enumerate(movie_ids):
-        if (i + 1) % 100 == 0:
-            print(f"  > Processing movie {i+1}/{len(movie_ids)}...")
+    for movie_id in movie_ids:
+        provider_info = best_watch_provider(results.get(movie_id))
 
-        provider_info = fetch_watch_provider(movie_id)
-        
         if provider_info:
             platform_id = provider_info['id']
             platform_name = provider_info['name']
             logo_path = provider_info['logo_path']
-            
+
             if platform_id not in unique_platforms:
                 unique_platforms[platform_id] = (platform_name, logo_path)
-            
-            movie_platform_relations.append((movie_id, platform_id))
 
-        time.sleep(0.25)
+            movie_platform_relations.append((movie_id, platform_id))
 
     print(f"API processing complete. Found {len(unique_platforms)} unique platforms.")
 
+    write_failure_report(FAILURE_REPORT, failures)
+    if failures:
+        print(f"WARNING: {len(failures)} movies failed and are missing from the CSVs, see {FAILURE_REPORT}.")
+        print("Run the script again to retry them; finished movies are served from the response cache.")
+
     platforms_output_path = './init-db/platforms.csv'
     print(f"Writing {platforms_output_path}...")
     with open(platforms_output_path, 'w', newline='', encoding='utf-8') as f:
@@ -86,4 +117,4 @@ try:
     print("All CSV files generated successfully!")
 
 except Exception as e:
-    print(f"An error occurred: {e}")
\ No newline at end of file
+    print(f"An error occurred: {e}")
@@ -1,99 +1,118 @@
+import asyncio
 import os
-import time
-import requests
 import pandas as pd
 from dotenv import load_dotenv
-from tqdm import tqdm  
+from tqdm import tqdm
+
+from response_cache import ResponseCache
+from download_utils import (
+    Checkpoint, DownloadError, TokenBucket, download_file, fetch_json, new_session, remove_partial_files, run_workers
+)
 
 """
 This script fetches poster and banner images for movies in a CSV using the TMDB API,
 saves them locally, and updates the CSV with the image paths.
+
+Movies are processed CONCURRENCY at a time under a shared RATE_LIMIT (requests/second).
+Every finished movie is appended to a checkpoint file, so a rerun skips movies that
+are already done and only retries the ones that failed or never ran. API responses
+also go through the shared response cache (response_cache.py), so rebuilding the
+CSV from scratch replays them locally.
 """
 
 
 load_dotenv()
 
 bearer_token = os.getenv("TMDB_BEARER_TOKEN")
+api_base = os.getenv("API_BASE_URL", "https://api.themoviedb.org/3")
 image_base = os.getenv("BASE_URL")
 poster_size = os.getenv("POSTER_SIZE", "w342")
 banner_size = os.getenv("BANNER_SIZE", "w780")
-images_dir = os.getenv("IMAGES_DIR", "images")      
+images_dir = os.getenv("IMAGES_DIR", "images")
+source_csv = os.getenv("SOURCE_CSV", "./archive/tmdb_5000_movies.csv")
 output_csv = os.getenv("OUTPUT_CSV", "movies_with_images.csv")
+checkpoint_file = os.getenv("CHECKPOINT_FILE", f"{output_csv}.checkpoint.jsonl")
 
+CONCURRENCY = int(os.getenv("CONCURRENCY", "8"))
+RATE_LIMIT = float(os.getenv("RATE_LIMIT", "10"))
 
-df = pd.read_csv("./archive/tmdb_5000_movies.csv")
-id_list = df["id"].tolist()
-
-os.makedirs(images_dir, exist_ok=True)
 
 headers = {
     "accept": "application/json",
     "Authorization": f"Bearer {bearer_token}"
 }
 
-poster_urls = []
-banner_urls = []
 
-RATE_LIMIT_DELAY = 0.35  
+async def fetch_image(session, bucket, images, size):
+    """Download the first image of a list; returns its file name or None"""
+    if not images:
+        return None
+    image_path = images[0]["file_path"].lstrip('/')
+    image_url = f"{image_base}/{size}/{image_path}"
+    await download_file(session, image_url, os.path.join(images_dir, os.path.basename(image_path)), bucket)
+    return image_path
 
-print("Starting")
 
-for movie_id in tqdm(id_list, desc="Processing movies"):
-    url = f"https://api.themoviedb.org/3/movie/{movie_id}/images"
+async def process_movie(session, bucket, cache, checkpoint, progress, movie_id):
+    url = f"{api_base}/movie/{movie_id}/images"
     params = {"include_image_language": "en,null"}
 
     try:
-        response = requests.get(url, headers=headers, params=params, timeout=10)
-
-        if response.status_code == 200:
-            data = response.json()
-
-            # Poster
-            if data.get("posters"):
-                poster_path = data["posters"][0]["file_path"].lstrip('/')
-                poster_url = f"{image_base}/{poster_size}/{poster_path}"
-                poster_filename = os.path.join(images_dir, os.path.basename(poster_path))
-
-                if not os.path.exists(poster_filename):
-                    img_data = requests.get(poster_url).content
-                    with open(poster_filename, "wb") as f:
-                        f.write(img_data)
-
-                poster_urls.append(poster_path)
-            else:
-                poster_urls.append(None)
-
-            # Banner
-            if data.get("backdrops"):
-                banner_path = data["backdrops"][0]["file_path"].lstrip('/')
-                banner_url = f"{image_base}/{banner_size}/{banner_path}"
-                banner_filename = os.path.join(images_dir, os.path.basename(banner_path))
-
-                if not os.path.exists(banner_filename):
-                    img_data = requests.get(banner_url).content
-                    with open(banner_filename, "wb") as f:
-                        f.write(img_data)
-
-                banner_urls.append(banner_path)
-            else:
-                banner_urls.append(None)
-
+        data = await fetch_json(session, url, bucket, params=params, cache=cache)
+        if data is None:
+            poster_path, banner_path = None, None
         else:
-            poster_urls.append(None)
-            banner_urls.append(None)
-
-        time.sleep(RATE_LIMIT_DELAY)
-
-    except Exception as e:
-        poster_urls.append(None)
-        banner_urls.append(None)
-        print(f"Error fetching movie {movie_id}: {e}")
-
-
-df["poster_url"] = poster_urls
-df["banner_url"] = banner_urls
-
-
-df.to_csv(output_csv, index=False)
-
-print("Finished")
+            poster_path, banner_path = await asyncio.gather(
+                fetch_image(session, bucket, data.get("posters"), poster_size),
+                fetch_image(session, bucket, data.get("backdrops"), banner_size)
+            )
+        checkpoint.record({"movie_id": movie_id, "poster_url": poster_path, "banner_url": banner_path})
+    except DownloadError as e:
+        # Not checkpointed, so the next run retries it
+        tqdm.write(f"Error fetching movie {movie_id}: {e}")
+    finally:
+        progress.update(1)
+
+
+async def main():
+    df = pd.read_csv(source_csv)
+    id_list = [int(movie_id) for movie_id in df["id"].tolist()]
+
+    os.makedirs(images_dir, exist_ok=True)
+    remove_partial_files(images_dir)
+    checkpoint = Checkpoint(checkpoint_file, key="movie_id")
+    pending = [movie_id for movie_id in id_list if movie_id not in checkpoint]
+    print(f"Starting: {len(id_list) - len(pending)} movies already done, {len(pending)} to fetch")
+
+    bucket = TokenBucket(RATE_LIMIT)
+    cache = ResponseCache()
+    try:
+        with tqdm(total=len(pending), desc="Processing movies") as progress:
+            async with new_session(CONCURRENCY * 2, headers=headers) as session:
+                await run_workers(
+                    pending,
+                    lambda movie_id: process_movie(session, bucket, cache, checkpoint, progress, movie_id),
+                    CONCURRENCY
+                )
+    finally:
+        checkpoint.close()
+        print(cache.summary())
+        cache.close()
+
+    failed = [movie_id for movie_id in id_list if movie_id not in checkpoint]
+    done = [checkpoint.get(movie_id) or {} for movie_id in id_list]
+    df["poster_url"] = [record.get("poster_url") for record in done]
+    df["banner_url"] = [record.get("banner_url") for record in done]
+
+    tmp_csv = f"{output_csv}.tmp"
+    df.to_csv(tmp_csv, index=False)
+    os.replace(tmp_csv, output_csv)
+
+    if failed:
+        print(f"Finished with {len(failed)} failed movies; run again to retry them")
+    else:
+        print("Finished")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
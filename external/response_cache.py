@@ -0,0 +1,130 @@
+"""
+Persistent HTTP response cache shared by the TMDB ingestion scripts.
+
+Responses are stored in one SQLite file (RESPONSE_CACHE_PATH, default
+external/.response_cache.sqlite3) keyed by URL + query parameters, with
+zlib-compressed bodies. Entries younger than RESPONSE_CACHE_TTL seconds are
+served without a request; older ones are revalidated with If-None-Match /
+If-Modified-Since when the server sent an ETag or Last-Modified.
+RESPONSE_CACHE_OFFLINE=1 serves every cached entry regardless of age, which
+turns a rerun into a local replay.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import zlib
+from urllib.parse import urlencode
+
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".response_cache.sqlite3")
+DEFAULT_TTL = 7 * 24 * 3600
+
+# Credentials are left out of cache keys so rotating a key keeps the cache
+SECRET_PARAMS = {"api_key"}
+
+# 404 is cached too: "this movie has no images" is a stable answer
+CACHEABLE_STATUSES = {200, 404}
+
+
+def cache_key(url, params=None):
+    params = {k: v for k, v in (params or {}).items() if k not in SECRET_PARAMS}
+    query = urlencode(sorted((k, str(v)) for k, v in params.items()))
+    return hashlib.sha1(f"{url}?{query}".encode("utf-8")).hexdigest()
+
+
+class CachedResponse:
+    def __init__(self, status, body, etag, last_modified, fetched_at):
+        self.status = status
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class ResponseCache:
+    def __init__(self, path=None, ttl=None, offline=None):
+        self.path = path or os.getenv("RESPONSE_CACHE_PATH", DEFAULT_PATH)
+        self.ttl = ttl if ttl is not None else int(os.getenv("RESPONSE_CACHE_TTL", str(DEFAULT_TTL)))
+        self.offline = offline if offline is not None else os.getenv("RESPONSE_CACHE_OFFLINE", "0") == "1"
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+        self.conn = sqlite3.connect(self.path)
+        # WAL lets several scripts share the file while one of them writes
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                body BLOB NOT NULL
+            )
+            """
+        )
+        self.conn.commit()
+
+    def get(self, url, params=None):
+        """Return the cached response or None"""
+        row = self.conn.execute(
+            "SELECT status, etag, last_modified, fetched_at, body FROM responses WHERE key = ?",
+            (cache_key(url, params),)
+        ).fetchone()
+        if row is None:
+            return None
+        status, etag, last_modified, fetched_at, body = row
+        return CachedResponse(status, zlib.decompress(body), etag, last_modified, fetched_at)
+
+    def is_fresh(self, cached):
+        return self.offline or time.time() - cached.fetched_at < self.ttl
+
+    def conditional_headers(self, cached):
+        """Validators to send when revalidating a stale entry"""
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+        return headers
+
+    def put(self, url, params, status, body, etag=None, last_modified=None):
+        if status not in CACHEABLE_STATUSES:
+            return
+        self.conn.execute(
+            """
+            INSERT INTO responses (key, url, status, etag, last_modified, fetched_at, body)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (key) DO UPDATE
+            SET status = excluded.status, etag = excluded.etag, last_modified = excluded.last_modified,
+                fetched_at = excluded.fetched_at, body = excluded.body
+            """,
+            (cache_key(url, params), url, status, etag, last_modified, time.time(), zlib.compress(body, 6))
+        )
+        self.conn.commit()
+
+    def touch(self, url, params=None):
+        """Mark an entry fresh again after a 304"""
+        self.conn.execute(
+            "UPDATE responses SET fetched_at = ? WHERE key = ?",
+            (time.time(), cache_key(url, params))
+        )
+        self.conn.commit()
+
+    def summary(self):
+        return f"response cache: {self.hits} hits, {self.revalidated} revalidated, {self.misses} fetched"
+
+    def close(self):
+        self.conn.close()
+
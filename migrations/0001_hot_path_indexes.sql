@@ -0,0 +1,34 @@
+-- Indexes for the foreign keys and ORDER BY clauses used by the API routes.
+-- PostgreSQL does not index foreign key columns automatically.
+
+------------------------------------------------------------
+-- movie_cast: /actors/<id>/movies and cast lookups by movie
+------------------------------------------------------------
+CREATE INDEX IF NOT EXISTS idx_movie_cast_person_id ON movie_cast (person_id, movie_id);
+CREATE INDEX IF NOT EXISTS idx_movie_cast_movie_id ON movie_cast (movie_id);
+
+------------------------------------------------------------
+-- movies_genres: /movies/genre/<id>
+------------------------------------------------------------
+CREATE INDEX IF NOT EXISTS idx_movies_genres_genre_id ON movies_genres (genre_id, movie_id);
+CREATE INDEX IF NOT EXISTS idx_movies_genres_movie_id ON movies_genres (movie_id);
+
+------------------------------------------------------------
+-- comments: /comments/ and /comments/movie/<id>[/best|/worst]
+------------------------------------------------------------
+CREATE INDEX IF NOT EXISTS idx_comments_created_at ON comments (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_comments_movie_created_at ON comments (movie_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_comments_movie_rating ON comments (movie_id, rating, created_at DESC)
+    WHERE rating IS NOT NULL;
+
+------------------------------------------------------------
+-- favorites: lookups by user
+------------------------------------------------------------
+CREATE INDEX IF NOT EXISTS idx_favorites_user_id ON favorites (user_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_favorites_movie_id ON favorites (movie_id);
+
+------------------------------------------------------------
+-- keyset pagination order of /movies/ and /actors/
+------------------------------------------------------------
+CREATE INDEX IF NOT EXISTS idx_movies_title_id ON movies (title, id);
+CREATE INDEX IF NOT EXISTS idx_people_name_id ON people (name, id);
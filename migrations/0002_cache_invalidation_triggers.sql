@@ -0,0 +1,50 @@
+-- Publish row changes of the cached tables on the 'cache_invalidation' channel
+-- so every app process can evict its local copy (see src/utils/cache_listener.py).
+-- Payload: {"table": "<table name>", "op": "INSERT|UPDATE|DELETE", "id": <row id>}
+
+CREATE OR REPLACE FUNCTION notify_cache_invalidation() RETURNS trigger AS $$
+DECLARE
+    changed_id INTEGER;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        changed_id := OLD.id;
+    ELSE
+        changed_id := NEW.id;
+    END IF;
+
+    PERFORM pg_notify(
+        'cache_invalidation',
+        json_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'id', changed_id)::text
+    );
+
+    -- An UPDATE that changes the primary key invalidates the old id too
+    IF TG_OP = 'UPDATE' AND OLD.id IS DISTINCT FROM NEW.id THEN
+        PERFORM pg_notify(
+            'cache_invalidation',
+            json_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'id', OLD.id)::text
+        );
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS movies_cache_invalidation ON movies;
+CREATE TRIGGER movies_cache_invalidation
+    AFTER INSERT OR UPDATE OR DELETE ON movies
+    FOR EACH ROW EXECUTE FUNCTION notify_cache_invalidation();
+
+DROP TRIGGER IF EXISTS people_cache_invalidation ON people;
+CREATE TRIGGER people_cache_invalidation
+    AFTER INSERT OR UPDATE OR DELETE ON people
+    FOR EACH ROW EXECUTE FUNCTION notify_cache_invalidation();
+
+DROP TRIGGER IF EXISTS genres_cache_invalidation ON genres;
+CREATE TRIGGER genres_cache_invalidation
+    AFTER INSERT OR UPDATE OR DELETE ON genres
+    FOR EACH ROW EXECUTE FUNCTION notify_cache_invalidation();
+
+DROP TRIGGER IF EXISTS platforms_cache_invalidation ON platforms;
+CREATE TRIGGER platforms_cache_invalidation
+    AFTER INSERT OR UPDATE OR DELETE ON platforms
+    FOR EACH ROW EXECUTE FUNCTION notify_cache_invalidation();
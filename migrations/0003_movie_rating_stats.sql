@@ -0,0 +1,96 @@
+-- Exact per-movie rating aggregates, kept current by a trigger on comments.
+-- histogram[r + 1] holds the number of comments rated r (0..10), so the mean
+-- is rating_sum / rating_count without rounding drift.
+
+ALTER TABLE comments
+    ADD CONSTRAINT comments_rating_range CHECK (rating BETWEEN 0 AND 10);
+
+CREATE TABLE IF NOT EXISTS movie_rating_stats (
+    movie_id INTEGER PRIMARY KEY REFERENCES movies(id) ON DELETE CASCADE,
+    rating_count INTEGER NOT NULL DEFAULT 0,
+    rating_sum BIGINT NOT NULL DEFAULT 0,
+    histogram INTEGER[] NOT NULL DEFAULT array_fill(0, ARRAY[11]),
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+------------------------------------------------------------
+-- incremental maintenance
+------------------------------------------------------------
+CREATE OR REPLACE FUNCTION apply_rating_delta(p_movie_id INTEGER, p_rating INTEGER, p_delta INTEGER)
+RETURNS void AS $$
+DECLARE
+    initial INTEGER[] := array_fill(0, ARRAY[11]);
+BEGIN
+    IF p_movie_id IS NULL OR p_rating IS NULL THEN
+        RETURN;
+    END IF;
+
+    initial[p_rating + 1] := p_delta;
+
+    INSERT INTO movie_rating_stats AS s (movie_id, rating_count, rating_sum, histogram)
+    VALUES (p_movie_id, p_delta, p_delta * p_rating, initial)
+    ON CONFLICT (movie_id) DO UPDATE
+    SET rating_count = s.rating_count + p_delta,
+        rating_sum = s.rating_sum + p_delta * p_rating,
+        histogram[p_rating + 1] = s.histogram[p_rating + 1] + p_delta,
+        updated_at = CURRENT_TIMESTAMP;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION comments_rating_stats_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND OLD.movie_id IS NOT DISTINCT FROM NEW.movie_id
+       AND OLD.rating IS NOT DISTINCT FROM NEW.rating THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM apply_rating_delta(OLD.movie_id, OLD.rating, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM apply_rating_delta(NEW.movie_id, NEW.rating, 1);
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS comments_rating_stats ON comments;
+CREATE TRIGGER comments_rating_stats
+    AFTER INSERT OR UPDATE OF rating, movie_id OR DELETE ON comments
+    FOR EACH ROW EXECUTE FUNCTION comments_rating_stats_trigger();
+
+------------------------------------------------------------
+-- bulk rebuild from comments (also used by 'flask rebuild-ratings')
+------------------------------------------------------------
+CREATE OR REPLACE FUNCTION rebuild_movie_rating_stats() RETURNS INTEGER AS $$
+DECLARE
+    rebuilt INTEGER;
+BEGIN
+    -- Block comment writes so no delta is lost between DELETE and INSERT
+    LOCK TABLE comments IN SHARE MODE;
+    DELETE FROM movie_rating_stats;
+
+    WITH counts AS (
+        SELECT movie_id, rating, COUNT(*) AS n
+        FROM comments
+        WHERE movie_id IS NOT NULL AND rating IS NOT NULL
+        GROUP BY movie_id, rating
+    )
+    INSERT INTO movie_rating_stats (movie_id, rating_count, rating_sum, histogram)
+    SELECT m.movie_id,
+           SUM(COALESCE(c.n, 0)),
+           SUM(COALESCE(c.n, 0) * r.rating),
+           array_agg(COALESCE(c.n, 0)::INTEGER ORDER BY r.rating)
+    FROM (SELECT DISTINCT movie_id FROM counts) m
+    CROSS JOIN generate_series(0, 10) AS r(rating)
+    LEFT JOIN counts c ON c.movie_id = m.movie_id AND c.rating = r.rating
+    GROUP BY m.movie_id;
+
+    GET DIAGNOSTICS rebuilt = ROW_COUNT;
+    RETURN rebuilt;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT rebuild_movie_rating_stats();
@@ -0,0 +1,94 @@
+-- Replace the row-level rating trigger from 0003 with statement-level triggers
+-- over transition tables, so a multi-row INSERT (e.g. POST /comments/bulk)
+-- touches each movie's movie_rating_stats row once instead of once per comment.
+
+DROP TRIGGER IF EXISTS comments_rating_stats ON comments;
+DROP FUNCTION IF EXISTS comments_rating_stats_trigger();
+DROP FUNCTION IF EXISTS apply_rating_delta(INTEGER, INTEGER, INTEGER);
+
+-- Apply (movie_id, rating, delta) triples, grouped per movie
+CREATE OR REPLACE FUNCTION apply_rating_deltas(p_movie_ids INTEGER[], p_ratings INTEGER[], p_deltas INTEGER[])
+RETURNS void AS $$
+BEGIN
+    WITH d AS (
+        SELECT movie_id, rating, delta
+        FROM unnest(p_movie_ids, p_ratings, p_deltas) AS t(movie_id, rating, delta)
+        WHERE movie_id IS NOT NULL AND rating IS NOT NULL
+    ),
+    per_rating AS (
+        SELECT movie_id, rating, SUM(delta) AS n
+        FROM d
+        GROUP BY movie_id, rating
+    ),
+    per_movie AS (
+        SELECT m.movie_id,
+               SUM(COALESCE(p.n, 0))::INTEGER AS rating_count,
+               SUM(COALESCE(p.n, 0) * r.rating)::BIGINT AS rating_sum,
+               array_agg(COALESCE(p.n, 0)::INTEGER ORDER BY r.rating) AS histogram
+        FROM (SELECT DISTINCT movie_id FROM per_rating) m
+        CROSS JOIN generate_series(0, 10) AS r(rating)
+        LEFT JOIN per_rating p ON p.movie_id = m.movie_id AND p.rating = r.rating
+        GROUP BY m.movie_id
+    )
+    INSERT INTO movie_rating_stats AS s (movie_id, rating_count, rating_sum, histogram)
+    SELECT movie_id, rating_count, rating_sum, histogram
+    FROM per_movie
+    ORDER BY movie_id  -- consistent lock order between concurrent statements
+    ON CONFLICT (movie_id) DO UPDATE
+    SET rating_count = s.rating_count + EXCLUDED.rating_count,
+        rating_sum = s.rating_sum + EXCLUDED.rating_sum,
+        histogram = ARRAY(
+            SELECT a + b
+            FROM unnest(s.histogram, EXCLUDED.histogram) WITH ORDINALITY AS h(a, b, i)
+            ORDER BY i
+        ),
+        updated_at = CURRENT_TIMESTAMP;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION comments_rating_stats_insert() RETURNS trigger AS $$
+BEGIN
+    PERFORM apply_rating_deltas(array_agg(movie_id), array_agg(rating), array_agg(1))
+    FROM new_rows;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION comments_rating_stats_delete() RETURNS trigger AS $$
+BEGIN
+    PERFORM apply_rating_deltas(array_agg(movie_id), array_agg(rating), array_agg(-1))
+    FROM old_rows;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION comments_rating_stats_update() RETURNS trigger AS $$
+BEGIN
+    PERFORM apply_rating_deltas(array_agg(movie_id), array_agg(rating), array_agg(delta))
+    FROM (
+        SELECT o.movie_id, o.rating, -1 AS delta
+        FROM old_rows o JOIN new_rows n ON n.id = o.id
+        WHERE o.rating IS DISTINCT FROM n.rating OR o.movie_id IS DISTINCT FROM n.movie_id
+        UNION ALL
+        SELECT n.movie_id, n.rating, 1 AS delta
+        FROM old_rows o JOIN new_rows n ON n.id = o.id
+        WHERE o.rating IS DISTINCT FROM n.rating OR o.movie_id IS DISTINCT FROM n.movie_id
+    ) changed;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER comments_rating_stats_insert
+    AFTER INSERT ON comments
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION comments_rating_stats_insert();
+
+CREATE TRIGGER comments_rating_stats_delete
+    AFTER DELETE ON comments
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION comments_rating_stats_delete();
+
+CREATE TRIGGER comments_rating_stats_update
+    AFTER UPDATE ON comments
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION comments_rating_stats_update();
@@ -0,0 +1,13 @@
+-- Full-text search over movies for GET /movies/search.
+-- A stored generated column keeps the vector current on every INSERT/UPDATE,
+-- including bulk upserts, without application code.
+
+ALTER TABLE movies
+    ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', COALESCE(title, '')), 'A') ||
+        setweight(to_tsvector('english', COALESCE(tagline, '')), 'B') ||
+        setweight(to_tsvector('english', COALESCE(overview, '')), 'C')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_movies_search_vector ON movies USING GIN (search_vector);
@@ -0,0 +1,6 @@
+-- Trigram index on people.name for GET /actors/search.
+-- Serves both prefix matches (ILIKE 'abc%') and typo-tolerant matches (<% / word_similarity).
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_people_name_trgm ON people USING GIN (name gin_trgm_ops);
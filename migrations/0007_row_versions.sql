@@ -0,0 +1,121 @@
+-- Validators for HTTP conditional requests (see src/utils/conditional.py).
+--
+-- movies and people get an updated_at column kept current by a trigger; the
+-- detail endpoints derive their ETag / Last-Modified from it.
+-- row_versions holds a change counter per scope that list endpoints use:
+--   'movies', 'people', 'platforms'  - any change to the table
+--   'comments:movie:<id>'            - any change to the comments of one movie
+-- Both let the app answer 304 with a primary key lookup instead of the full query.
+
+ALTER TABLE movies ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE people ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP;
+
+CREATE OR REPLACE FUNCTION set_updated_at() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at := CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS movies_set_updated_at ON movies;
+CREATE TRIGGER movies_set_updated_at
+    BEFORE UPDATE ON movies
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
+DROP TRIGGER IF EXISTS people_set_updated_at ON people;
+CREATE TRIGGER people_set_updated_at
+    BEFORE UPDATE ON people
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
+CREATE TABLE IF NOT EXISTS row_versions (
+    scope TEXT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    changed_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO row_versions (scope, version)
+VALUES ('movies', 1), ('people', 1), ('platforms', 1)
+ON CONFLICT (scope) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_row_versions(p_scopes TEXT[]) RETURNS void AS $$
+BEGIN
+    INSERT INTO row_versions AS v (scope, version, changed_at)
+    SELECT DISTINCT scope, 1, CURRENT_TIMESTAMP
+    FROM unnest(p_scopes) AS t(scope)
+    WHERE scope IS NOT NULL
+    ORDER BY scope  -- consistent lock order between concurrent statements
+    ON CONFLICT (scope) DO UPDATE
+    SET version = v.version + 1,
+        changed_at = CURRENT_TIMESTAMP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- One bump per statement, so bulk writes cost a single row_versions update
+CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+BEGIN
+    PERFORM bump_row_versions(ARRAY[TG_TABLE_NAME::TEXT]);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS movies_row_version ON movies;
+CREATE TRIGGER movies_row_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON movies
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+
+DROP TRIGGER IF EXISTS people_row_version ON people;
+CREATE TRIGGER people_row_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON people
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+
+DROP TRIGGER IF EXISTS platforms_row_version ON platforms;
+CREATE TRIGGER platforms_row_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON platforms
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+
+-- Comments are versioned per movie, from the transition tables
+CREATE OR REPLACE FUNCTION comments_row_version_insert() RETURNS trigger AS $$
+BEGIN
+    PERFORM bump_row_versions(array_agg('comments:movie:' || movie_id))
+    FROM new_rows;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION comments_row_version_delete() RETURNS trigger AS $$
+BEGIN
+    PERFORM bump_row_versions(array_agg('comments:movie:' || movie_id))
+    FROM old_rows;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION comments_row_version_update() RETURNS trigger AS $$
+BEGIN
+    PERFORM bump_row_versions(array_agg('comments:movie:' || movie_id))
+    FROM (
+        SELECT movie_id FROM old_rows
+        UNION
+        SELECT movie_id FROM new_rows
+    ) changed;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS comments_row_version_insert ON comments;
+CREATE TRIGGER comments_row_version_insert
+    AFTER INSERT ON comments
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION comments_row_version_insert();
+
+DROP TRIGGER IF EXISTS comments_row_version_delete ON comments;
+CREATE TRIGGER comments_row_version_delete
+    AFTER DELETE ON comments
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION comments_row_version_delete();
+
+DROP TRIGGER IF EXISTS comments_row_version_update ON comments;
+CREATE TRIGGER comments_row_version_update
+    AFTER UPDATE ON comments
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION comments_row_version_update();
@@ -0,0 +1,25 @@
+-- The statement-level UPDATE trigger from 0004 ran on every UPDATE of
+-- comments, including each like/dislike click, and joined both transition
+-- tables every time. Updates go back to a row-level trigger that only fires
+-- when rating or movie_id is in the SET list and actually changes; INSERT and
+-- DELETE keep the transition-table triggers, where bulk statements benefit.
+
+DROP TRIGGER IF EXISTS comments_rating_stats_update ON comments;
+DROP FUNCTION IF EXISTS comments_rating_stats_update();
+
+CREATE OR REPLACE FUNCTION comments_rating_stats_row_update() RETURNS trigger AS $$
+BEGIN
+    PERFORM apply_rating_deltas(
+        ARRAY[OLD.movie_id, NEW.movie_id],
+        ARRAY[OLD.rating, NEW.rating],
+        ARRAY[-1, 1]
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER comments_rating_stats_update
+    AFTER UPDATE OF rating, movie_id ON comments
+    FOR EACH ROW
+    WHEN (OLD.rating IS DISTINCT FROM NEW.rating OR OLD.movie_id IS DISTINCT FROM NEW.movie_id)
+    EXECUTE FUNCTION comments_rating_stats_row_update();
@@ -0,0 +1,7 @@
+-- Btree prefix index on people.name for GET /actors/search?prefix=.
+-- Trigrams need three characters to narrow anything down, so a one or two
+-- letter prefix turned the GIN index into a scan of most of people. With
+-- text_pattern_ops, lower(name) LIKE 'ab%' is a range scan at any length, and
+-- ORDER BY lower(name) USING ~<~, id reads the first candidates straight off it.
+
+CREATE INDEX IF NOT EXISTS idx_people_name_lower_prefix ON people (lower(name) text_pattern_ops, id);
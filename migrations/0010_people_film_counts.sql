@@ -0,0 +1,148 @@
+-- Film counts per person for GET /actors/search, kept up to date by triggers
+-- on movie_cast and people so search can rank by them without counting.
+-- Ranking the first 1000 names alphabetically and counting films only for
+-- those (0009) missed prolific actors further down a common prefix. With the
+-- count and the lowercased name next to each other:
+--   * idx_people_film_counts_rank reads the most prolific names first, so a
+--     common prefix stops as soon as `limit` of them match;
+--   * idx_people_film_counts_name_prefix range-scans a rare prefix and only
+--     sorts its few matches.
+-- Both are index-only for the prefix search; the planner picks one per prefix.
+
+CREATE TABLE IF NOT EXISTS people_film_counts (
+    person_id INTEGER PRIMARY KEY REFERENCES people(id) ON DELETE CASCADE ON UPDATE CASCADE,
+    name_key TEXT NOT NULL,  -- lower(people.name)
+    film_count INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT INTO people_film_counts AS f (person_id, name_key, film_count)
+SELECT p.id, lower(p.name), COUNT(mc.id)
+FROM people p
+LEFT JOIN movie_cast mc ON mc.person_id = p.id
+GROUP BY p.id
+ON CONFLICT (person_id) DO UPDATE
+SET name_key = EXCLUDED.name_key,
+    film_count = EXCLUDED.film_count;
+
+CREATE INDEX IF NOT EXISTS idx_people_film_counts_rank
+    ON people_film_counts (film_count DESC, name_key, person_id);
+CREATE INDEX IF NOT EXISTS idx_people_film_counts_name_prefix
+    ON people_film_counts (name_key text_pattern_ops, film_count, person_id);
+
+-- Search no longer reads people by lower(name)
+DROP INDEX IF EXISTS idx_people_name_lower_prefix;
+
+-- Apply (person_id, delta) pairs, grouped per person
+CREATE OR REPLACE FUNCTION apply_film_count_deltas(p_person_ids INTEGER[], p_deltas INTEGER[])
+RETURNS void AS $$
+BEGIN
+    INSERT INTO people_film_counts AS f (person_id, name_key, film_count)
+    SELECT d.person_id, lower(p.name), d.n
+    FROM (
+        SELECT person_id, SUM(delta)::INTEGER AS n
+        FROM unnest(p_person_ids, p_deltas) AS t(person_id, delta)
+        WHERE person_id IS NOT NULL
+        GROUP BY person_id
+    ) d
+    JOIN people p ON p.id = d.person_id
+    WHERE d.n <> 0
+    ORDER BY d.person_id  -- consistent lock order between concurrent statements
+    ON CONFLICT (person_id) DO UPDATE
+    SET film_count = f.film_count + EXCLUDED.film_count;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION movie_cast_film_counts_insert() RETURNS trigger AS $$
+BEGIN
+    PERFORM apply_film_count_deltas(array_agg(person_id), array_agg(1))
+    FROM new_rows;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION movie_cast_film_counts_delete() RETURNS trigger AS $$
+BEGIN
+    PERFORM apply_film_count_deltas(array_agg(person_id), array_agg(-1))
+    FROM old_rows;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION movie_cast_film_counts_update() RETURNS trigger AS $$
+BEGIN
+    PERFORM apply_film_count_deltas(array_agg(person_id), array_agg(delta))
+    FROM (
+        SELECT o.person_id, -1 AS delta
+        FROM old_rows o JOIN new_rows n ON n.id = o.id
+        WHERE o.person_id IS DISTINCT FROM n.person_id
+        UNION ALL
+        SELECT n.person_id, 1 AS delta
+        FROM old_rows o JOIN new_rows n ON n.id = o.id
+        WHERE o.person_id IS DISTINCT FROM n.person_id
+    ) changed;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION movie_cast_film_counts_truncate() RETURNS trigger AS $$
+BEGIN
+    UPDATE people_film_counts SET film_count = 0 WHERE film_count <> 0;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS movie_cast_film_counts_insert ON movie_cast;
+CREATE TRIGGER movie_cast_film_counts_insert
+    AFTER INSERT ON movie_cast
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION movie_cast_film_counts_insert();
+
+DROP TRIGGER IF EXISTS movie_cast_film_counts_delete ON movie_cast;
+CREATE TRIGGER movie_cast_film_counts_delete
+    AFTER DELETE ON movie_cast
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION movie_cast_film_counts_delete();
+
+DROP TRIGGER IF EXISTS movie_cast_film_counts_update ON movie_cast;
+CREATE TRIGGER movie_cast_film_counts_update
+    AFTER UPDATE ON movie_cast
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION movie_cast_film_counts_update();
+
+DROP TRIGGER IF EXISTS movie_cast_film_counts_truncate ON movie_cast;
+CREATE TRIGGER movie_cast_film_counts_truncate
+    AFTER TRUNCATE ON movie_cast
+    FOR EACH STATEMENT EXECUTE FUNCTION movie_cast_film_counts_truncate();
+
+-- New people start at zero films; renames follow into name_key
+CREATE OR REPLACE FUNCTION people_film_counts_insert() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO people_film_counts (person_id, name_key)
+    SELECT id, lower(name) FROM new_rows
+    ORDER BY id
+    ON CONFLICT (person_id) DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION people_film_counts_update() RETURNS trigger AS $$
+BEGIN
+    UPDATE people_film_counts f
+    SET name_key = lower(n.name)
+    FROM new_rows n
+    WHERE f.person_id = n.id AND f.name_key IS DISTINCT FROM lower(n.name);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS people_film_counts_insert ON people;
+CREATE TRIGGER people_film_counts_insert
+    AFTER INSERT ON people
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION people_film_counts_insert();
+
+DROP TRIGGER IF EXISTS people_film_counts_update ON people;
+CREATE TRIGGER people_film_counts_update
+    AFTER UPDATE ON people
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION people_film_counts_update();
@@ -0,0 +1,361 @@
+import csv
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+from psycopg2 import sql
+
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'init-db')
+
+# Separate from MIGRATION_LOCK_ID; only one loader may sync the tables at a time
+LOADER_LOCK_ID = 7261002
+
+STAGE_PREFIX = '_load_'
+
+# Rows kept in step with their parent by triggers (one per movie); pruning
+# removes them with the parent through ON DELETE CASCADE
+DERIVED_TABLES = {'movie_rating_stats'}
+
+
+class LoadError(Exception):
+    """A CSV could not be staged or synced"""
+
+
+class TableSpec:
+    """How one CSV maps onto a table.
+
+    `key` identifies a row across loads (the primary key, or the natural key
+    for link tables without ids in the CSV). `level` orders tables for
+    foreign keys: parents are upserted first and children pruned first.
+    """
+
+    def __init__(self, table, filename, columns, key, level):
+        self.table = table
+        self.filename = filename
+        self.columns = columns
+        self.key = key
+        self.level = level
+
+    @property
+    def stage(self):
+        return STAGE_PREFIX + self.table
+
+
+# Catalog tables from init-db/. users and comments are left out on purpose:
+# their CSVs are only seed data and the live rows belong to the app.
+TABLE_SPECS = [
+    TableSpec('genres', 'db_genres.csv', ['id', 'genre_name'], ['id'], 0),
+    TableSpec('platforms', 'db_platforms.csv', ['id', 'platform_name', 'logo_path'], ['id'], 0),
+    TableSpec('people', 'db_people.csv',
+              ['id', 'name', 'biography', 'birth_date', 'photo_url', 'created_at'], ['id'], 0),
+    TableSpec('question_types', 'db_question_types.csv', ['id', 'question_type_name'], ['id'], 0),
+    TableSpec('movies', 'db_movies.csv',
+              ['id', 'title', 'overview', 'tagline', 'release_date', 'poster_file', 'banner_file', 'platform_id'],
+              ['id'], 1),
+    TableSpec('movie_cast', 'db_movie_cast.csv',
+              ['id', 'movie_id', 'person_id', 'role', 'character_name'], ['id'], 2),
+    TableSpec('movies_genres', 'db_movies_genres.csv', ['movie_id', 'genre_id'], ['movie_id', 'genre_id'], 2),
+    TableSpec('statistic', 'db_statistic.csv',
+              ['movie_id', 'revenue', 'runtime', 'vote_avg', 'vote_count', 'budget'], ['movie_id'], 2),
+    TableSpec('movie_question', 'db_movie_question.csv',
+              ['id', 'question_type', 'movie1_id', 'movie2_id'], ['id'], 2),
+]
+
+
+def _key_match(spec, left, right):
+    return sql.SQL(' AND ').join(
+        sql.SQL('{}.{} = {}.{}').format(sql.Identifier(left), sql.Identifier(col), sql.Identifier(right), sql.Identifier(col))
+        for col in spec.key
+    )
+
+
+def _columns(names, alias=None):
+    if alias:
+        return sql.SQL(', ').join(sql.SQL('{}.{}').format(sql.Identifier(alias), sql.Identifier(c)) for c in names)
+    return sql.SQL(', ').join(sql.Identifier(c) for c in names)
+
+
+def _check_header(spec, path):
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        header = next(csv.reader(f), None)
+    if header is None or len(header) != len(spec.columns):
+        raise LoadError(f"{path}: expected {len(spec.columns)} columns ({', '.join(spec.columns)}), got {header}")
+
+
+def stage_table(database_url, spec, path):
+    """COPY one CSV into a fresh unlogged staging table. Returns (rows, seconds)"""
+    _check_header(spec, path)
+    started = time.perf_counter()
+    conn = psycopg2.connect(database_url)
+    try:
+        with conn.cursor() as cursor:
+            stage = sql.Identifier(spec.stage)
+            cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(stage))
+            # Same column types as the target, so COPY validates every value
+            cursor.execute(sql.SQL("CREATE UNLOGGED TABLE {} AS SELECT {} FROM {} WITH NO DATA").format(
+                stage, _columns(spec.columns), sql.Identifier(spec.table)
+            ))
+            with open(path, 'r', encoding='utf-8') as f:
+                cursor.copy_expert(
+                    sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv, HEADER true)").format(
+                        stage, _columns(spec.columns)
+                    ).as_string(conn),
+                    f
+                )
+            rows = cursor.rowcount
+
+            cursor.execute(sql.SQL("SELECT {} FROM {} GROUP BY {} HAVING COUNT(*) > 1 LIMIT 1").format(
+                _columns(spec.key), stage, _columns(spec.key)
+            ))
+            duplicate = cursor.fetchone()
+            if duplicate:
+                raise LoadError(f"{path}: duplicate key {dict(zip(spec.key, duplicate))}")
+
+            cursor.execute(sql.SQL("ANALYZE {}").format(stage))
+            conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        raise LoadError(f"{path}: {e}".strip()) from e
+    finally:
+        conn.close()
+    return rows, time.perf_counter() - started
+
+
+def upsert_table(database_url, spec):
+    """Update changed rows and insert new ones from the staging table, in one transaction.
+
+    Returns (inserted, updated, seconds).
+    """
+    started = time.perf_counter()
+    value_columns = [c for c in spec.columns if c not in spec.key]
+    table, stage = sql.Identifier(spec.table), sql.Identifier(spec.stage)
+    changed = sql.Identifier(STAGE_PREFIX + 'changed')
+    conn = psycopg2.connect(database_url)
+    try:
+        with conn.cursor() as cursor:
+            # New and changed rows in one join. Statement-level triggers
+            # (row_versions) fire even when nothing matches, so a table whose
+            # CSV didn't change must not run the UPDATE or INSERT at all.
+            difference = sql.SQL('')
+            if value_columns:
+                difference = sql.SQL(" OR ({}) IS DISTINCT FROM ({})").format(
+                    _columns(value_columns, 't'), _columns(value_columns, 's')
+                )
+            cursor.execute(sql.SQL(
+                "CREATE TEMP TABLE {changed} ON COMMIT DROP AS "
+                "SELECT {stage_cols}, t.{first_key} IS NULL AS _load_new "
+                "FROM {stage} s LEFT JOIN {table} t ON {match} "
+                "WHERE t.{first_key} IS NULL{difference}"
+            ).format(
+                changed=changed, table=table, stage=stage, stage_cols=_columns(spec.columns, 's'),
+                first_key=sql.Identifier(spec.key[0]), match=_key_match(spec, 't', 's'), difference=difference
+            ))
+            cursor.execute(sql.SQL(
+                "SELECT COUNT(*) FILTER (WHERE _load_new), COUNT(*) FILTER (WHERE NOT _load_new) FROM {}"
+            ).format(changed))
+            inserted, updated = cursor.fetchone()
+
+            if updated:
+                cursor.execute(sql.SQL(
+                    "UPDATE {table} t SET ({cols}) = ROW({changed_cols}) FROM {changed} c "
+                    "WHERE {match} AND NOT c._load_new"
+                ).format(
+                    table=table, changed=changed, cols=_columns(value_columns),
+                    changed_cols=_columns(value_columns, 'c'), match=_key_match(spec, 't', 'c')
+                ))
+                updated = cursor.rowcount
+
+            if inserted:
+                cursor.execute(sql.SQL(
+                    "INSERT INTO {table} ({cols}) SELECT {changed_cols} FROM {changed} c WHERE c._load_new"
+                ).format(
+                    table=table, changed=changed, cols=_columns(spec.columns),
+                    changed_cols=_columns(spec.columns, 'c')
+                ))
+                inserted = cursor.rowcount
+
+            # Explicit ids leave SERIAL sequences behind; move them past the data
+            cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", (spec.table,))
+            sequence = cursor.fetchone()[0]
+            if sequence and 'id' in spec.columns:
+                cursor.execute(
+                    sql.SQL("SELECT setval(%s, GREATEST((SELECT MAX(id) FROM {}), 1))").format(table),
+                    (sequence,)
+                )
+            conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        raise LoadError(f"{spec.table}: {e}".strip()) from e
+    finally:
+        conn.close()
+    return inserted, updated, time.perf_counter() - started
+
+
+def _referencing_keys(cursor, table):
+    """Foreign keys pointing at `table`: [(child schema, child table, child columns, parent columns)]"""
+    cursor.execute(
+        """
+        SELECT n.nspname, c.relname,
+               ARRAY(SELECT a.attname FROM unnest(co.conkey) WITH ORDINALITY k(attnum, i)
+                     JOIN pg_attribute a ON a.attrelid = co.conrelid AND a.attnum = k.attnum ORDER BY k.i),
+               ARRAY(SELECT a.attname FROM unnest(co.confkey) WITH ORDINALITY k(attnum, i)
+                     JOIN pg_attribute a ON a.attrelid = co.confrelid AND a.attnum = k.attnum ORDER BY k.i)
+        FROM pg_constraint co
+        JOIN pg_class c ON c.oid = co.conrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE co.contype = 'f' AND co.confrelid = %s::regclass
+        ORDER BY c.relname, co.conname
+        """,
+        (table,)
+    )
+    return cursor.fetchall()
+
+
+def prune_table(database_url, spec):
+    """Delete rows that are no longer in the CSV.
+
+    Children are pruned first, so a row that is still referenced (by app
+    data such as comments or favorites, or by a child table left out of the
+    load) would only go through ON DELETE CASCADE. Such rows make the load
+    fail with a LoadError naming the referencing tables instead; nothing of
+    this table is deleted then. Returns (deleted, seconds).
+    """
+    started = time.perf_counter()
+    table, stage = sql.Identifier(spec.table), sql.Identifier(spec.stage)
+    doomed = sql.Identifier(STAGE_PREFIX + 'doomed')
+    conn = psycopg2.connect(database_url)
+    try:
+        with conn.cursor() as cursor:
+            references = [ref for ref in _referencing_keys(cursor, spec.table) if ref[1] not in DERIVED_TABLES]
+            columns = list(spec.key)
+            for _, _, _, parent_columns in references:
+                columns += [c for c in parent_columns if c not in columns]
+
+            # FOR UPDATE also holds off new references until commit: inserting
+            # a child takes a KEY SHARE lock on its parent row
+            cursor.execute(sql.SQL(
+                "CREATE TEMP TABLE {doomed} ON COMMIT DROP AS SELECT {cols} FROM {table} WITH NO DATA"
+            ).format(doomed=doomed, table=table, cols=_columns(columns)))
+            cursor.execute(sql.SQL(
+                "INSERT INTO {doomed} SELECT {target_cols} FROM {table} t "
+                "WHERE NOT EXISTS (SELECT 1 FROM {stage} s WHERE {match}) FOR UPDATE OF t"
+            ).format(
+                doomed=doomed, table=table, stage=stage,
+                target_cols=_columns(columns, 't'), match=_key_match(spec, 't', 's')
+            ))
+            deleted = cursor.rowcount
+
+            if deleted:
+                referenced = {}
+                for schema, child, child_columns, parent_columns in references:
+                    cursor.execute(sql.SQL(
+                        "SELECT COUNT(*) FROM {child} c WHERE EXISTS (SELECT 1 FROM {doomed} d WHERE {match})"
+                    ).format(
+                        child=sql.Identifier(schema, child), doomed=doomed,
+                        match=sql.SQL(' AND ').join(
+                            sql.SQL('c.{} = d.{}').format(sql.Identifier(c), sql.Identifier(p))
+                            for c, p in zip(child_columns, parent_columns)
+                        )
+                    ))
+                    count = cursor.fetchone()[0]
+                    if count:
+                        referenced[child] = referenced.get(child, 0) + count
+                if referenced:
+                    raise LoadError(
+                        f"{spec.table}: {deleted} rows missing from the CSV are still referenced by "
+                        + ', '.join(f"{child} ({count} references)" for child, count in referenced.items())
+                        + "; remove those first or load with --keep-removed"
+                    )
+
+                cursor.execute(sql.SQL("DELETE FROM {table} t USING {doomed} d WHERE {match}").format(
+                    table=table, doomed=doomed, match=_key_match(spec, 't', 'd')
+                ))
+                deleted = cursor.rowcount
+            conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        raise LoadError(f"{spec.table}: {e}".strip()) from e
+    finally:
+        conn.close()
+    return deleted, time.perf_counter() - started
+
+
+def _run_parallel(executor, func, specs, *args):
+    """Run func(spec, *args) for every spec and return {table: result}; re-raises the first error"""
+    futures = {spec.table: executor.submit(func, spec, *args) for spec in specs}
+    return {table: future.result() for table, future in futures.items()}
+
+
+def _levels(specs):
+    levels = {}
+    for spec in specs:
+        levels.setdefault(spec.level, []).append(spec)
+    return [levels[level] for level in sorted(levels)]
+
+
+def load_data(database_url, data_dir=DATA_DIR, tables=None, workers=4, prune=True):
+    """Sync the catalog tables with the CSVs in data_dir.
+
+    1. COPY every CSV into an unlogged staging table, all in parallel.
+    2. Upsert level by level (parents before children), tables of a level in
+       parallel, each in its own short transaction.
+    3. Delete rows missing from the CSVs, children before parents; a row
+       still referenced from outside the load fails it with a LoadError.
+
+    Readers keep working throughout; each table changes in one commit.
+    Returns one stats dict per table.
+    """
+    specs = [spec for spec in TABLE_SPECS if tables is None or spec.table in tables]
+    if tables is not None:
+        unknown = set(tables) - {spec.table for spec in specs}
+        if unknown:
+            raise LoadError(f"Unknown tables: {', '.join(sorted(unknown))}")
+
+    paths = {}
+    for spec in list(specs):
+        path = os.path.join(data_dir, spec.filename)
+        if os.path.exists(path):
+            paths[spec.table] = path
+        elif tables is None:
+            print(f"Skipping {spec.table}: {path} not found")
+            specs.remove(spec)
+        else:
+            raise LoadError(f"{spec.table}: {path} not found")
+
+    lock_conn = psycopg2.connect(database_url)
+    try:
+        with lock_conn.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", (LOADER_LOCK_ID,))
+            if not cursor.fetchone()[0]:
+                raise LoadError("Another data load is running")
+
+        stats = {spec.table: {'table': spec.table} for spec in specs}
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+                for table, (rows, seconds) in _run_parallel(
+                        executor, lambda spec: stage_table(database_url, spec, paths[spec.table]), specs).items():
+                    stats[table].update(rows=rows, copy_seconds=seconds)
+
+                for level in _levels(specs):
+                    for table, (inserted, updated, seconds) in _run_parallel(
+                            executor, lambda spec: upsert_table(database_url, spec), level).items():
+                        stats[table].update(inserted=inserted, updated=updated, deleted=0, sync_seconds=seconds)
+
+                if prune:
+                    for level in reversed(_levels(specs)):
+                        for table, (deleted, seconds) in _run_parallel(
+                                executor, lambda spec: prune_table(database_url, spec), level).items():
+                            stats[table]['deleted'] = deleted
+                            stats[table]['sync_seconds'] += seconds
+        finally:
+            with lock_conn.cursor() as cursor:
+                for spec in specs:
+                    cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(spec.stage)))
+                cursor.execute("SELECT pg_advisory_unlock(%s)", (LOADER_LOCK_ID,))
+            lock_conn.commit()
+    finally:
+        lock_conn.close()
+
+    return [stats[spec.table] for spec in specs]
@@ -1,5 +1,7 @@
 from flask import current_app, g
 import psycopg2
+from contextlib import contextmanager
+from uuid import uuid4
 from psycopg2.extras import RealDictCursor
 
 
@@ -42,4 +44,66 @@ def execute_query(query, params=None, fetch=False):
     finally:
             cursor.close()
         
-    return result
\ No newline at end of file
+    return result
+
+
+@contextmanager
+def transaction():
+    """Unit of work: run several statements on one connection with a single commit.
+
+    Yields a RealDictCursor. Everything executed on it is committed when the
+    block exits and rolled back if it raises. Don't call execute_query inside
+    the block, it commits on its own.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    try:
+        yield cursor
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def stream_query(query, params=None, batch_size=None):
+    """Execute a SELECT on a named server-side cursor and return a generator of its rows.
+
+    The query runs and the first batch is fetched before this returns, so a
+    bad query or a statement timeout raises here, while the caller can still
+    answer with an error status. Only `batch_size` rows are held in memory at
+    a time. The generator must be consumed inside the request context (see
+    flask.stream_with_context).
+    """
+    batch_size = batch_size or current_app.config['STREAM_BATCH_SIZE']
+    conn = get_db_connection()
+    cursor = conn.cursor(name=f"stream_{uuid4().hex}", cursor_factory=RealDictCursor)
+
+    try:
+        cursor.execute(query, params)
+        first_batch = cursor.fetchmany(batch_size)
+    except psycopg2.Error:
+        _close_stream(conn, cursor)
+        raise
+    return _stream_batches(conn, cursor, first_batch, batch_size)
+
+
+def _stream_batches(conn, cursor, rows, batch_size):
+    try:
+        while rows:
+            for row in rows:
+                yield row
+            rows = cursor.fetchmany(batch_size)
+    finally:
+        _close_stream(conn, cursor)
+
+
+def _close_stream(conn, cursor):
+    # Named cursors live inside a transaction, end it so the connection
+    # goes back to the pool idle.
+    try:
+        cursor.close()
+    except psycopg2.Error:
+        pass
+    conn.rollback()
@@ -0,0 +1,96 @@
+import os
+import re
+import psycopg2
+
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'migrations')
+
+# Arbitrary constant so two runners (e.g. two containers starting at once)
+# never apply the same migration concurrently.
+MIGRATION_LOCK_ID = 7261001
+
+MIGRATION_FILE_PATTERN = re.compile(r'^(\d+)_([\w-]+)\.sql$')
+
+
+def list_migrations(migrations_dir=MIGRATIONS_DIR):
+    """Return (version, name, path) for every migration file, ordered by version"""
+    migrations = []
+    for filename in os.listdir(migrations_dir):
+        match = MIGRATION_FILE_PATTERN.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(migrations_dir, filename)))
+
+    migrations.sort()
+    versions = [version for version, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError("Duplicate migration version in " + migrations_dir)
+    return migrations
+
+
+def run_migrations(database_url, migrations_dir=MIGRATIONS_DIR):
+    """Apply every migration not yet recorded in schema_migrations.
+
+    Each migration runs in its own transaction together with the row that
+    records it, so a failed migration leaves no partial state behind.
+    Returns the list of applied versions.
+    """
+    applied = []
+    conn = psycopg2.connect(database_url)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    name VARCHAR(255) NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+                """
+            )
+            conn.commit()
+
+            cursor.execute("SELECT version FROM schema_migrations")
+            done = {row[0] for row in cursor.fetchall()}
+
+            for version, name, path in list_migrations(migrations_dir):
+                if version in done:
+                    continue
+
+                with open(path, 'r', encoding='utf-8') as f:
+                    sql = f.read()
+
+                try:
+                    cursor.execute(sql)
+                    cursor.execute(
+                        "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                        (version, name)
+                    )
+                    conn.commit()
+                except psycopg2.Error:
+                    conn.rollback()
+                    raise
+
+                print(f"Applied migration {version:04d}_{name}")
+                applied.append(version)
+
+            cursor.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+            conn.commit()
+    finally:
+        conn.close()
+
+    return applied
+
+
+def get_schema_version(database_url):
+    """Return the highest applied migration version, or 0 if none"""
+    conn = psycopg2.connect(database_url)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT to_regclass('schema_migrations') IS NOT NULL")
+            if not cursor.fetchone()[0]:
+                return 0
+            cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+            return cursor.fetchone()[0]
+    finally:
+        conn.close()
@@ -0,0 +1,193 @@
+import threading
+import time
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+
+
+# Upper bounds (in milliseconds) of the checkout wait-time histogram buckets
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class PoolTimeout(PoolError):
+    """No connection became free within the checkout timeout"""
+
+
+class BlockingConnectionPool:
+    """Thread-safe connection pool that waits for a free connection.
+
+    Unlike psycopg2.pool.SimpleConnectionPool, getconn() blocks up to
+    `timeout` seconds when all `maxconn` connections are checked out.
+    Idle connections are checked before being handed out: closed ones are
+    dropped, ones idle longer than `max_idle` are reopened and ones idle
+    longer than `validate_after` are pinged with SELECT 1.
+    """
+
+    def __init__(self, minconn, maxconn, dsn, timeout=5.0, max_idle=600.0, validate_after=30.0):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.dsn = dsn
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.validate_after = validate_after
+
+        self._cond = threading.Condition()
+        self._idle = []         # [(conn, returned_at)], most recently returned last
+        self._in_use = set()
+        self._opening = 0       # slots reserved for connections being opened
+        self._waiting = 0
+        self._closed = False
+
+        self.checkouts = 0
+        self.timeouts = 0
+        self.recycled = 0
+        self.wait_histogram = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.wait_total_ms = 0.0
+
+        for _ in range(minconn):
+            self._idle.append((self._connect(), time.monotonic()))
+
+    def _connect(self):
+        return psycopg2.connect(self.dsn)
+
+    def _size(self):
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    def _discard(self, conn):
+        self.recycled += 1
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def _is_usable(self, conn, returned_at):
+        """Decide whether an idle connection can be handed out as is"""
+        if conn.closed:
+            return False
+        idle_for = time.monotonic() - returned_at
+        if idle_for > self.max_idle:
+            return False
+        if idle_for > self.validate_after:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                conn.rollback()
+            except psycopg2.Error:
+                return False
+        return True
+
+    def _record_wait(self, waited_ms):
+        self.wait_total_ms += waited_ms
+        for i, bound in enumerate(WAIT_BUCKETS_MS):
+            if waited_ms <= bound:
+                self.wait_histogram[i] += 1
+                return
+        self.wait_histogram[-1] += 1
+
+    def getconn(self, timeout=None):
+        """Check out a connection, waiting up to `timeout` seconds for one"""
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+
+        while True:
+            conn = None
+            returned_at = None
+
+            with self._cond:
+                if self._closed:
+                    raise PoolError("connection pool is closed")
+
+                self._waiting += 1
+                try:
+                    while not self._idle and self._size() >= self.maxconn:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.timeouts += 1
+                            raise PoolTimeout(f"no connection available within {timeout}s")
+                        self._cond.wait(remaining)
+                        if self._closed:
+                            raise PoolError("connection pool is closed")
+                finally:
+                    self._waiting -= 1
+
+                # The connection counts as in use (or opening) from here on, so
+                # validation and connecting can happen outside the lock
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    self._in_use.add(conn)
+                else:
+                    self._opening += 1
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._opening -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._opening -= 1
+                    self._in_use.add(conn)
+            elif not self._is_usable(conn, returned_at):
+                with self._cond:
+                    self._in_use.discard(conn)
+                    self._discard(conn)
+                    self._cond.notify()
+                continue
+
+            with self._cond:
+                self.checkouts += 1
+                self._record_wait((time.monotonic() - started) * 1000)
+            return conn
+
+    def putconn(self, conn, close=False):
+        """Return a connection; broken ones and ones in a transaction are cleaned up"""
+        if not close and not conn.closed:
+            status = conn.info.transaction_status
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                close = True
+            elif status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    close = True
+
+        with self._cond:
+            if conn not in self._in_use:
+                raise PoolError("trying to put unkeyed connection")
+            self._in_use.discard(conn)
+            if close or conn.closed or self._closed:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            for conn, _ in self._idle:
+                conn.close()
+            for conn in self._in_use:
+                conn.close()
+            self._idle = []
+            self._in_use = set()
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            histogram = {f"le_{bound}ms": count for bound, count in zip(WAIT_BUCKETS_MS, self.wait_histogram)}
+            histogram['inf'] = self.wait_histogram[-1]
+            return {
+                'in_use': len(self._in_use),
+                'idle': len(self._idle),
+                'opening': self._opening,
+                'waiting': self._waiting,
+                'max': self.maxconn,
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'recycled': self.recycled,
+                'wait_avg_ms': round(self.wait_total_ms / self.checkouts, 3) if self.checkouts else 0.0,
+                'wait_histogram': histogram
+            }
@@ -1,36 +1,215 @@
 from flask import Blueprint, jsonify, request
-from src.config.database import execute_query
+from src.config.database import execute_query, stream_query, transaction
+from src.utils.pagination import get_page_args, build_page
+from src.utils.multiget import get_ids_arg, order_by_ids
+from src.utils.streaming import get_stream_mode, stream_rows
+from src.utils.cache import people_cache
+from src.utils.bulk import parse_bulk_body, validate_records, reject_duplicates, bulk_result, is_int, write_rows
+from src.utils.fields import get_fields_arg, select_columns, project
+from src.utils.conditional import (
+    conditional, scope_version, cached_version, cached_versions, validated_last_modified, validated_versions
+)
 
 actors_bp = Blueprint('actors', __name__)
 
+# Number of suggestions returned by /actors/search
+SEARCH_DEFAULT_LIMIT = 10
+SEARCH_MAX_LIMIT = 50
+# Shorter prefixes only match the start of the name; trigrams can't serve them
+WORD_PREFIX_MIN_LENGTH = 3
+
+# Cache-Control hint for conditional GETs: reuse for max-age seconds, then revalidate
+ACTORS_CACHE_CONTROL = 'public, max-age=300'
+
 # Column names are written explicitly on purpose in SELECT statements.
 # This makes debugging easier in case the database table changes.
 
+# Columns clients may request with ?fields=, and the ones always selected
+ACTOR_FIELDS = ('id', 'name', 'biography', 'birth_date', 'photo_url', 'created_at')
+ACTOR_KEY_FIELDS = ('id', 'name')
+
 @actors_bp.route('/', methods=['GET'])
+@conditional(cached_versions(people_cache, lambda ids: get_actors_by_ids(ids), scope_version('people')), ACTORS_CACHE_CONTROL)
 def get_actors():
-    """Get all actors"""
+    """Get a page of actors ordered by (name, id), the actors in ?ids=, or stream all of them"""
+    fields, err = get_fields_arg(ACTOR_FIELDS)
+    if err:
+        return jsonify({'error': err}), 400
+
+    ids, err = get_ids_arg()
+    if err:
+        return jsonify({'error': err}), 400
+    if ids:
+        actors, err = get_actors_by_ids(ids, fields, validated_versions())
+        if err:
+            return jsonify({'error': err}), 500
+        return jsonify(actors)
+
+    limit, cursor, err = get_page_args((str, int))
+    if err:
+        return jsonify({'error': err}), 400
+
     try:
+        where = ""
+        params = []
+        if cursor:
+            where = "WHERE (name, id) > (%s, %s)"
+            params.extend(cursor)
+
+        stream_mode = get_stream_mode()
+        if stream_mode:
+            actors = stream_query(
+                f"""
+                SELECT {select_columns(fields, ACTOR_FIELDS, ACTOR_KEY_FIELDS)}
+                FROM people
+                {where}
+                ORDER BY name, id
+                """,
+                tuple(params)
+            )
+            return stream_rows(actors, stream_mode)
+
+        params.append(limit + 1)
+
         actors = execute_query(
-            """
-            SELECT id, name, biography, birth_date, photo_url, created_at
+            f"""
+            SELECT {select_columns(fields, ACTOR_FIELDS, ACTOR_KEY_FIELDS)}
             FROM people
-            ORDER BY name
+            {where}
+            ORDER BY name, id
+            LIMIT %s
             """,
+            tuple(params),
             fetch=True
         )
         
-        return jsonify([dict(actor) for actor in actors])
+        return jsonify(build_page(actors, limit, ('name', 'id')))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@actors_bp.route('/<int:actor_id>', methods=['GET'])
-def get_actor(actor_id):
-    """Get a specific actor"""
+def get_actors_by_ids(ids, fields=None, min_versions=None):
+    """Get several actors in one query, in the order of ids; cached actors skip the query.
+
+    `min_versions` maps ids to the updated_at a cached copy must have.
+    """
+    try:
+        min_versions = min_versions or {}
+        found = []
+        uncached = []
+        for actor_id in ids:
+            cached = people_cache.get(actor_id, min_versions.get(actor_id))
+            if cached is not None:
+                found.append(cached)
+            else:
+                uncached.append(actor_id)
+
+        if uncached:
+            # Full rows are fetched only to fill the cache, with their
+            # updated_at as the version; with ?fields= just the requested
+            # columns are read and nothing is cached
+            if fields is None:
+                actors = execute_query(
+                    f"SELECT {select_columns(None, ACTOR_FIELDS)}, updated_at FROM people WHERE id = ANY(%s)",
+                    (uncached,),
+                    fetch=True
+                )
+                for actor in actors:
+                    people_cache.set(actor['id'], actor, version=actor.pop('updated_at'))
+            else:
+                actors = execute_query(
+                    f"SELECT {select_columns(fields, ACTOR_FIELDS)} FROM people WHERE id = ANY(%s)",
+                    (uncached,),
+                    fetch=True
+                )
+            found.extend(actors)
+
+        found = [project(actor, fields) for actor in found]
+        return order_by_ids(found, ids), None
+    except Exception as e:
+        return None, str(e)
+
+
+@actors_bp.route('/search', methods=['GET'])
+def search_actors():
+    """Autocomplete actor names by ?prefix= or typo-tolerant ?q=; the closest matches, most prolific first"""
+    prefix = request.args.get('prefix', '').strip()
+    q = request.args.get('q', '').strip()
+    if not prefix and not q:
+        return jsonify({'error': 'prefix or q is required'}), 400
+
+    try:
+        limit = min(int(request.args.get('limit', SEARCH_DEFAULT_LIMIT)), SEARCH_MAX_LIMIT)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if limit < 1:
+        return jsonify({'error': 'limit must be positive'}), 400
+
+    try:
+        # Film counts are kept in people_film_counts (migration 0010), so every
+        # match is ranked by them, not only a first batch of names
+        if q:
+            # Trigram word similarity, served by idx_people_name_trgm (migration 0006)
+            candidates = """
+                SELECT f.person_id AS id, word_similarity(%(q)s, p.name) AS score, f.film_count, f.name_key
+                FROM people p
+                JOIN people_film_counts f ON f.person_id = p.id
+                WHERE %(q)s <%% p.name
+                ORDER BY score DESC, f.film_count DESC, f.name_key, f.person_id
+                LIMIT %(limit)s
+            """
+            params = {'q': q}
+        else:
+            # Names starting with the prefix rank above names with a later word
+            # starting with it (trigrams, 3+ characters)
+            escaped = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            candidates = """
+                (SELECT person_id AS id, 1 AS score, film_count, name_key
+                 FROM people_film_counts
+                 WHERE name_key LIKE lower(%(starts)s)
+                 ORDER BY film_count DESC, name_key, person_id
+                 LIMIT %(limit)s)
+            """
+            if len(prefix) >= WORD_PREFIX_MIN_LENGTH:
+                candidates += """
+                UNION ALL
+                (SELECT f.person_id, 0, f.film_count, f.name_key
+                 FROM people p
+                 JOIN people_film_counts f ON f.person_id = p.id
+                 WHERE p.name ILIKE %(word)s AND f.name_key NOT LIKE lower(%(starts)s)
+                 ORDER BY f.film_count DESC, f.name_key, f.person_id
+                 LIMIT %(limit)s)
+                """
+            params = {'starts': escaped + '%', 'word': '% ' + escaped + '%'}
+
+        actors = execute_query(
+            f"""
+            WITH candidates AS ({candidates})
+            SELECT p.id, p.name, p.photo_url, c.film_count, c.score
+            FROM candidates c
+            JOIN people p ON p.id = c.id
+            ORDER BY c.score DESC, c.film_count DESC, c.name_key, c.id
+            LIMIT %(limit)s
+            """,
+            {**params, 'limit': limit},
+            fetch=True
+        )
+
+        return jsonify(actors)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def load_actor(actor_id, min_version=None):
+    """Get an actor through people_cache; a cached copy older than `min_version` (an updated_at) is refetched"""
+    cached = people_cache.get(actor_id, min_version)
+    if cached is not None:
+        return cached, None
+
     try:
         actor = execute_query(
             """
-            SELECT id, name, biography, birth_date, photo_url, created_at
+            SELECT id, name, biography, birth_date, photo_url, created_at, updated_at
             FROM people
             WHERE id = %s
             """,
@@ -38,10 +217,30 @@ def get_actor(actor_id):
             fetch=True
         )
         if actor:
-            return jsonify(dict(actor[0]))
-        return jsonify({'error': 'Actor not found'}), 404
+            row = actor[0]
+            people_cache.set(actor_id, row, version=row.pop('updated_at'))
+            return row, None
+        return None, None
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return None, str(e)
+
+
+@actors_bp.route('/<int:actor_id>', methods=['GET'])
+@conditional(cached_version(people_cache, lambda actor_id: actor_id, load_actor), ACTORS_CACHE_CONTROL)
+def get_actor(actor_id):
+    """Get a specific actor"""
+    fields, err = get_fields_arg(ACTOR_FIELDS)
+    if err:
+        return jsonify({'error': err}), 400
+
+    # The validator cached the row; an older copy is refetched, so the body
+    # always matches the ETag it is sent with
+    actor, err = load_actor(actor_id, validated_last_modified())
+    if err:
+        return jsonify({'error': err}), 500
+    if actor is None:
+        return jsonify({'error': 'Actor not found'}), 404
+    return jsonify(project(actor, fields))
 
 
 @actors_bp.route('/<int:actor_id>/movies', methods=['GET'])
@@ -80,8 +279,8 @@ def get_actor_movies(actor_id):
         )
         
         return jsonify({
-            'actor': dict(actor[0]),
-            'movies': [dict(movie) for movie in movies],
+            'actor': actor[0],
+            'movies': movies,
             'total_movies': len(movies)
         })
     except Exception as e:
@@ -117,12 +316,61 @@ def create_actor():
         )
         
         if result:
-            return jsonify(dict(result[0])), 201
+            return jsonify(result[0]), 201
         return jsonify({'error': 'Failed to create actor'}), 500
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@actors_bp.route('/bulk', methods=['POST'])
+def bulk_upsert_actors():
+    """Create or replace many actors (JSON array or NDJSON) in one transaction"""
+    records, err = parse_bulk_body()
+    if err:
+        return jsonify({'error': err}), 400
+
+    try:
+        valid, errors = validate_records(
+            records,
+            ('id', 'name'),
+            lambda actor: None if is_int(actor['id']) else "id must be an integer"
+        )
+        valid = reject_duplicates(valid, errors, 'id')
+
+        with transaction() as cursor:
+            written = write_rows(
+                cursor,
+                """
+                INSERT INTO people (id, name, biography, birth_date, photo_url)
+                VALUES %s
+                ON CONFLICT (id) DO UPDATE
+                SET name = EXCLUDED.name,
+                    biography = EXCLUDED.biography,
+                    birth_date = EXCLUDED.birth_date,
+                    photo_url = EXCLUDED.photo_url
+                """,
+                [
+                    (index, (
+                        actor['id'],
+                        actor['name'],
+                        actor.get('biography'),
+                        actor.get('birth_date'),
+                        actor.get('photo_url')
+                    ))
+                    for index, actor in valid
+                ],
+                errors
+            )
+
+        records_by_index = dict(valid)
+        ids = [records_by_index[index]['id'] for index in written]
+        people_cache.invalidate(*ids)
+
+        result = bulk_result(list(zip(written, ids)), errors)
+        return jsonify(result), 201 if result['written'] else 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # TODO: Subject to change, might better handle parameters with a helper function
 @actors_bp.route('/<int:actor_id>', methods=['PUT'])
 def update_actor(actor_id):
@@ -176,9 +424,10 @@ def update_actor(actor_id):
             tuple(params),
             fetch=True
         )
+        people_cache.invalidate(actor_id)
         
         if result:
-            return jsonify(dict(result[0]))
+            return jsonify(result[0])
         return jsonify({'error': 'Failed to update actor'}), 500
         
     except Exception as e:
@@ -205,10 +454,11 @@ def delete_actor(actor_id):
             (actor_id,)
             # Remember, ON DELETE CASCADE in movie_cast table
         )
+        people_cache.invalidate(actor_id)
         
         return jsonify({
             'message': 'Actor deleted successfully',
-            'actor': dict(actor[0])
+            'actor': actor[0]
         })
         
     except Exception as e:
@@ -1,34 +1,73 @@
+from datetime import datetime
 from flask import Blueprint, jsonify, request
 from src.services.comments_service import (
     get_all_comments,
+    stream_all_comments,
     get_comment_by_id,
+    get_comments_by_ids,
     create_comment,
+    bulk_create_comments,
     update_comment,
     delete_comment_by_id,
     get_comments_for_movie,
     get_comments_for_movie_sorted,
     like_comment,
-    dislike_comment
+    dislike_comment,
+    COMMENT_FIELDS
 )
+from src.utils.bulk import parse_bulk_body
+from src.utils.conditional import conditional, scope_version
+from src.utils.fields import get_fields_arg
+from src.utils.multiget import get_ids_arg
+from src.utils.pagination import get_page_args
+from src.utils.streaming import get_stream_mode, stream_rows
 
 comments_bp = Blueprint('comments', __name__)
 
 @comments_bp.route('/', methods=['GET'])
 def get_all_comments_route():
-    comments, err = get_all_comments()
+    fields, err = get_fields_arg(COMMENT_FIELDS)
+    if err:
+        return jsonify({"error": err}), 400
+
+    ids, err = get_ids_arg()
+    if err:
+        return jsonify({"error": err}), 400
+    if ids:
+        comments, err = get_comments_by_ids(ids, fields)
+        if err:
+            return jsonify({"error": err}), 500
+        return jsonify(comments), 200
+
+    limit, cursor, err = get_page_args((datetime, int))
+    if err:
+        return jsonify({"error": err}), 400
+
+    stream_mode = get_stream_mode()
+    if stream_mode:
+        comments, err = stream_all_comments(cursor, fields)
+        if err:
+            return jsonify({"error": err}), 500
+        return stream_rows(comments, stream_mode)
+
+    page, err = get_all_comments(limit, cursor, fields)
     if err:
         return jsonify({"error": err}), 500
-    return jsonify([dict(c) for c in comments]), 200
+    return jsonify(page), 200
 
     
 @comments_bp.route('/<int:comment_id>', methods=['GET'])
 def get_comment_route(comment_id):
-    comment, err = get_comment_by_id(comment_id)
+    fields, err = get_fields_arg(COMMENT_FIELDS)
+    if err:
+        return jsonify({"error": err}), 400
+
+    comment, err = get_comment_by_id(comment_id, fields)
     if err:
         if err == "Comment not found":
             return jsonify({"message": err}), 404
         return jsonify({"error": err}), 500
-    return jsonify(dict(comment)), 200
+    return jsonify(comment), 200
 
     
 @comments_bp.route('/', methods=['POST'])
@@ -40,7 +79,20 @@ def create_comment_route():
     new_comment, err = create_comment(data)
     if err:
         return jsonify({"error": err}), 400
-    return jsonify(dict(new_comment)), 201
+    return jsonify(new_comment), 201
+
+
+
+@comments_bp.route('/bulk', methods=['POST'])
+def bulk_create_comments_route():
+    records, err = parse_bulk_body()
+    if err:
+        return jsonify({'error': err}), 400
+
+    result, err = bulk_create_comments(records)
+    if err:
+        return jsonify({"error": err}), 400
+    return jsonify(result), 201 if result['written'] else 400
 
     
 @comments_bp.route('/<int:comment_id>', methods=['PUT', 'PATCH'])
@@ -56,7 +108,7 @@ def update_comment_route(comment_id):
             return jsonify({"message": err}), 404
         return jsonify({"error": err}), 400
         
-    return jsonify(dict(updated)), 200
+    return jsonify(updated), 200
 
     
 @comments_bp.route('/<int:comment_id>', methods=['DELETE'])
@@ -68,17 +120,22 @@ def delete_comment_route(comment_id):
             return jsonify({"message": err}), 404
         return jsonify({"error": err}), 500
         
-    return jsonify(dict(deleted)), 200
+    return jsonify(deleted), 200
 
 
 @comments_bp.route('/movie/<int:movie_id>', methods=['GET'])
+@conditional(scope_version(lambda movie_id: f"comments:movie:{movie_id}"), 'no-cache')
 def get_comments_for_movie_route(movie_id):
-    comments, err = get_comments_for_movie(movie_id)
+    fields, err = get_fields_arg(COMMENT_FIELDS)
+    if err:
+        return jsonify({"error": err}), 400
+
+    comments, err = get_comments_for_movie(movie_id, fields)
     if err:
         if err == "No comments found for this movie":
             return jsonify({"message": err}), 404
         return jsonify({"error": err}), 500
-    return jsonify([dict(c) for c in comments]), 200
+    return jsonify(comments), 200
 
     
 @comments_bp.route('/movie/<int:movie_id>/best', methods=['GET'])
@@ -88,7 +145,7 @@ def get_comments_best_route(movie_id):
         if err == "No rated comments found for this movie":
             return jsonify({"message": err}), 404
         return jsonify({"error": err}), 500
-    return jsonify([dict(c) for c in comments]), 200
+    return jsonify(comments), 200
 
     
 @comments_bp.route('/movie/<int:movie_id>/worst', methods=['GET'])
@@ -98,7 +155,7 @@ def get_comments_worst_route(movie_id):
         if err == "No rated comments found for this movie":
             return jsonify({"message": err}), 404
         return jsonify({"error": err}), 500
-    return jsonify([dict(c) for c in comments]), 200
+    return jsonify(comments), 200
 
 
 @comments_bp.route('/<int:comment_id>/like', methods=['POST'])
@@ -108,7 +165,7 @@ def like_comment_route(comment_id):
         if err == "Comment not found":
             return jsonify({"message": err}), 404
         return jsonify({"error": err}), 500
-    return jsonify(dict(updated)), 200
+    return jsonify(updated), 200
 
     
 @comments_bp.route('/<int:comment_id>/dislike', methods=['POST'])
@@ -118,4 +175,4 @@ def dislike_comment_route(comment_id):
         if err == "Comment not found":
             return jsonify({"message": err}), 404
         return jsonify({"error": err}), 500
-    return jsonify(dict(updated)), 200
\ No newline at end of file
+    return jsonify(updated), 200
\ No newline at end of file
@@ -1,4 +1,7 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, current_app, jsonify
+from src.utils.cache import get_cache_stats
+from src.utils.image_variants import variant_cache
+from src.utils.vote_buffer import get_comment_vote_buffer
 
 home_bp = Blueprint('home', __name__)
 
@@ -10,6 +13,36 @@ def home():
         'message': 'Welcome to Movem API',
         'endpoints': {
             'movies': '/movies',
-            'actors': '/actors'
+            'actors': '/actors',
+            'images': '/images'
         }
-    })
\ No newline at end of file
+    })
+
+
+@home_bp.route('/stats/cache')
+def cache_stats():
+    """Hit/miss/eviction counters of the entity caches"""
+    return jsonify(get_cache_stats())
+
+
+@home_bp.route('/stats/pool')
+def pool_stats():
+    """In-use/idle/waiting counts and checkout wait times of the connection pool"""
+    if current_app.db_pool is None:
+        return jsonify({'error': 'Database pool is not available'}), 503
+    return jsonify(current_app.db_pool.stats())
+
+
+@home_bp.route('/stats/votes')
+def vote_buffer_stats():
+    """Pending and flushed counts of the comment vote buffer"""
+    buffer = get_comment_vote_buffer()
+    if buffer is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **buffer.stats()})
+
+
+@home_bp.route('/stats/images')
+def image_variant_stats():
+    """Size and hit/render/eviction counts of the resized image cache"""
+    return jsonify(variant_cache.stats())
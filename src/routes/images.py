@@ -0,0 +1,140 @@
+import hashlib
+import io
+import os
+import re
+from flask import Blueprint, current_app, jsonify, send_file
+from werkzeug.security import safe_join
+from src.utils.cache import TTLCache
+from src.utils.image_manifest import get_image_manifest, SHA256
+from src.utils.image_variants import (
+    variant_cache,
+    variant_key,
+    get_variant_width,
+    negotiate_format,
+    render_variant,
+    resizing_available,
+    RESIZABLE_EXTENSIONS
+)
+
+images_bp = Blueprint('images', __name__)
+
+# Poster/banner files sit directly in IMAGES_DIR, platform logos in IMAGES_DIR/platforms.
+# Names are a single path segment with an image extension; anything else is a 404.
+IMAGE_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_-]+\.(jpg|jpeg|png|webp|svg)$')
+PLATFORMS_SUBDIR = 'platforms'
+
+# sha256 of each file keyed by (path, size, mtime), so a file is hashed once
+# and a replaced file gets a new ETag
+etag_cache = TTLCache('image_etags', maxsize=16384, ttl=24 * 3600)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def resolve_image_path(name, subdir=None):
+    """Return the absolute path of an image, or None if the name is invalid or missing"""
+    if not IMAGE_NAME_PATTERN.match(name):
+        return None
+    root = current_app.config['IMAGES_DIR']
+    if subdir:
+        root = os.path.join(root, subdir)
+    path = safe_join(root, name)
+    if path is None or not os.path.isfile(path):
+        return None
+    return path
+
+
+def content_etag(path, stat, manifest_name=None):
+    """Content hash of a file, from the image manifest when it is current, else computed on first use"""
+    if manifest_name is not None:
+        manifest = get_image_manifest()
+        if manifest.matches(manifest_name, stat):
+            return manifest.get(manifest_name)[SHA256][:32]
+
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    etag = etag_cache.get(key)
+    if etag is None:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        etag = digest.hexdigest()[:32]
+        etag_cache.set(key, etag)
+    return etag
+
+
+def serve_image(path, mimetype=None, manifest_name=None):
+    """send_file with Range support, a content-hash ETag and immutable caching.
+
+    The file object is handed to the WSGI server's file_wrapper, which servers
+    like gunicorn turn into sendfile(); USE_X_SENDFILE delegates to a proxy.
+    """
+    stat = os.stat(path)
+    response = send_file(
+        path,
+        mimetype=mimetype,
+        conditional=True,
+        etag=content_etag(path, stat, manifest_name),
+        last_modified=stat.st_mtime,
+        max_age=current_app.config['IMAGE_MAX_AGE']
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def serve_image_or_variant(name, subdir=None):
+    """Serve the original file, or a resized variant when ?w= or ?size= is given"""
+    path = resolve_image_path(name, subdir)
+    if path is None:
+        return jsonify({'error': 'Image not found'}), 404
+    manifest_name = f"{subdir}/{name}" if subdir else name
+
+    width, err = get_variant_width()
+    if err:
+        return jsonify({'error': err}), 400
+    if width is None or not resizing_available() or name.rsplit('.', 1)[1] not in RESIZABLE_EXTENSIONS:
+        return serve_image(path, manifest_name=manifest_name)
+
+    variant_format = negotiate_format()
+    mimetype, _, extension, _ = variant_format
+    key = variant_key(name, subdir, os.stat(path), width, extension)
+    try:
+        variant_path, data = variant_cache.get_or_create(key, lambda: render_variant(path, width, variant_format))
+    except (OSError, ValueError) as e:
+        print(f"WARNING: Failed to render {key}, serving the original. Error: {e}")
+        return serve_image(path, manifest_name=manifest_name)
+
+    if data is not None:
+        # Larger than the whole cache budget, so it was never written to disk
+        response = send_file(
+            io.BytesIO(data),
+            mimetype=mimetype,
+            conditional=True,
+            etag=hashlib.sha256(data).hexdigest()[:32],
+            last_modified=os.stat(path).st_mtime,
+            max_age=current_app.config['IMAGE_MAX_AGE']
+        )
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+    else:
+        # Pinned until send_file has opened it; an open file outlives eviction
+        try:
+            response = serve_image(variant_path, mimetype)
+        finally:
+            variant_cache.release(key)
+
+    # The encoding depends on the Accept header
+    response.vary.add('Accept')
+    return response
+
+
+@images_bp.route('/<name>', methods=['GET'])
+def get_image(name):
+    """Serve a poster or banner file (movies.poster_file / banner_file)"""
+    return serve_image_or_variant(name)
+
+
+@images_bp.route('/platforms/<name>', methods=['GET'])
+def get_platform_logo(name):
+    """Serve a platform logo (platforms.logo_path without its leading slash)"""
+    return serve_image_or_variant(name, PLATFORMS_SUBDIR)
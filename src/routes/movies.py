@@ -1,40 +1,145 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 from src.config.database import execute_query
 from src.services.movie_service import (
     get_movies_db,
+    stream_movies_db,
+    search_movies_db,
     get_movie_by_id_db,
+    get_movies_by_ids_db,
+    get_movie_full_db,
+    MOVIE_FULL_SECTIONS,
+    MOVIE_FIELDS,
+    PLATFORM_FIELDS,
     create_movie_db,
+    bulk_upsert_movies_db,
     update_movie_db,
     delete_movie_db,
     get_movies_by_genre_db,
+    stream_movies_by_genre_db,
     get_platforms,
     get_platform_by_id,
     create_platform,
     update_platform,
     delete_platform_by_id
 )
+from src.services.comments_service import get_movie_ratings
+from src.utils.bulk import parse_bulk_body
+from src.utils.cache import movie_cache, platform_cache, ALL_PLATFORMS_KEY
+from src.utils.conditional import (
+    conditional, scope_version, cached_version, cached_versions, validated_last_modified, validated_versions
+)
+from src.utils.fields import get_fields_arg, project
+from src.utils.multiget import get_ids_arg
+from src.utils.pagination import get_page_args
+from src.utils.streaming import get_stream_mode, stream_rows
 
 movies_bp = Blueprint('movies', __name__)
 
+# Cache-Control hints for conditional GETs: reuse for max-age seconds, then revalidate
+MOVIES_CACHE_CONTROL = 'public, max-age=60'
+PLATFORMS_CACHE_CONTROL = 'public, max-age=3600'
+
 
 @movies_bp.route('/', methods=['GET'])
+@conditional(cached_versions(movie_cache, get_movies_by_ids_db, scope_version('movies')), MOVIES_CACHE_CONTROL)
 def get_movies():
-    """Get all movies"""
+    """Get a page of movies, the movies listed in ?ids=, or stream all of them with ?stream=json|ndjson"""
+    fields, err = get_fields_arg(MOVIE_FIELDS)
+    if err:
+        return jsonify({"error": err}), 400
+
+    ids, err = get_ids_arg()
+    if err:
+        return jsonify({"error": err}), 400
+    if ids:
+        movies, err = get_movies_by_ids_db(ids, fields, validated_versions())
+        if err:
+            return jsonify({"error": err}), 500
+        return jsonify(movies), 200
 
-    movies, err = get_movies_db()
+    limit, cursor, err = get_page_args((str, int))
+    if err:
+        return jsonify({"error": err}), 400
+
+    stream_mode = get_stream_mode()
+    if stream_mode:
+        movies, err = stream_movies_db(cursor, fields)
+        if err:
+            return jsonify({"error": err}), 500
+        return stream_rows(movies, stream_mode)
+
+    page, err = get_movies_db(limit, cursor, fields)
     if err:
         return jsonify({"error": err}), 500
-    return jsonify([dict(movie) for movie in movies]), 200
+    return jsonify(page), 200
 
 
 @movies_bp.route('/<int:movie_id>', methods=['GET'])
+@conditional(cached_version(movie_cache, lambda movie_id: movie_id, lambda movie_id: get_movie_by_id_db(movie_id)), MOVIES_CACHE_CONTROL)
 def get_movie_by_id(movie_id):
     """Get a specific movie"""
-    movie, err = get_movie_by_id_db(movie_id)
+    fields, err = get_fields_arg(MOVIE_FIELDS)
+    if err:
+        return jsonify({"error": err}), 400
+
+    movie, err = get_movie_by_id_db(movie_id, validated_last_modified())
     if err:
         return jsonify({"error": err}), 500
     if not movie:
         return jsonify({"message": "Movie not found"}), 404
+    return jsonify(project(movie, fields)), 200
+
+
+@movies_bp.route('/search', methods=['GET'])
+@conditional(scope_version('movies'), MOVIES_CACHE_CONTROL)
+def search_movies():
+    """Ranked full-text search over movie title, tagline and overview"""
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify({"error": "q is required"}), 400
+
+    limit, cursor, err = get_page_args((float, int))
+    if err:
+        return jsonify({"error": err}), 400
+
+    page, err = search_movies_db(q, limit, cursor)
+    if err:
+        return jsonify({"error": err}), 500
+    return jsonify(page), 200
+
+
+@movies_bp.route('/<int:movie_id>/ratings', methods=['GET'])
+def get_movie_ratings_route(movie_id):
+    """Get the rating distribution and exact mean of a movie"""
+    ratings, err = get_movie_ratings(movie_id)
+    if err:
+        if err == "Movie not found":
+            return jsonify({"message": err}), 404
+        return jsonify({"error": err}), 500
+    return jsonify(ratings), 200
+
+
+@movies_bp.route('/<int:movie_id>/full', methods=['GET'])
+def get_movie_full(movie_id):
+    """Get a movie with platform, genres, cast, statistics and latest comments in one query"""
+    include_arg = request.args.get('include')
+    include = [section.strip() for section in include_arg.split(',') if section.strip()] if include_arg else list(MOVIE_FULL_SECTIONS)
+    unknown = [section for section in include if section not in MOVIE_FULL_SECTIONS]
+    if unknown:
+        return jsonify({"error": f"Unknown sections: {', '.join(unknown)}. Allowed: {', '.join(MOVIE_FULL_SECTIONS)}"}), 400
+
+    try:
+        max_size = current_app.config['PAGE_SIZE_MAX']
+        cast_limit = min(int(request.args.get('cast_limit', 15)), max_size)
+        comments_limit = min(int(request.args.get('comments_limit', current_app.config['PAGE_SIZE_DEFAULT'])), max_size)
+    except ValueError:
+        return jsonify({"error": "cast_limit and comments_limit must be integers"}), 400
+
+    movie, err = get_movie_full_db(movie_id, dict.fromkeys(include), max(cast_limit, 0), max(comments_limit, 0))
+    if err:
+        if err == "Movie not found":
+            return jsonify({"message": err}), 404
+        return jsonify({"error": err}), 500
     return jsonify(movie), 200
 
 
@@ -48,7 +153,20 @@ def create_movie():
     new_movie, err = create_movie_db(movie_data)
     if err:
         return jsonify({"error": err}), 400
-    return jsonify(dict(new_movie)), 201
+    return jsonify(new_movie), 201
+
+
+@movies_bp.route("/bulk", methods=["POST"])
+def bulk_upsert_movies():
+    """Create or replace many movies (JSON array or NDJSON) in one transaction"""
+    records, err = parse_bulk_body()
+    if err:
+        return jsonify({"error": err}), 400
+
+    result, err = bulk_upsert_movies_db(records)
+    if err:
+        return jsonify({"error": err}), 400
+    return jsonify(result), 201 if result['written'] else 400
 
 
 @movies_bp.route("/<int:id>", methods=["PUT"])
@@ -63,7 +181,7 @@ def update_movie(id):
         return jsonify({"error": err}), 400
     if not updated_movie:
         return jsonify({"message": "Movie not found"}), 404
-    return jsonify(dict(updated_movie)), 200
+    return jsonify(updated_movie), 200
 
 
 
@@ -75,39 +193,64 @@ def delete_movie(id):
         return jsonify({"error": err}), 500
     if not deleted_movie:
         return jsonify({"message": "Movie not found"}), 404
-    return jsonify(dict(deleted_movie)), 200
+    return jsonify(deleted_movie), 200
 
 
 @movies_bp.route("/genre/<int:genre_id>", methods=["GET"])
 def get_movies_by_genre(genre_id):
-    """Get movie by genre_id"""
-    movies, err = get_movies_by_genre_db(genre_id)
+    """Get a page of movies by genre_id, or stream all of them with ?stream=json|ndjson"""
+    fields, err = get_fields_arg(MOVIE_FIELDS)
+    if err:
+        return jsonify({"error": err}), 400
+
+    limit, cursor, err = get_page_args((str, int))
+    if err:
+        return jsonify({"error": err}), 400
+
+    stream_mode = get_stream_mode()
+    if stream_mode:
+        movies, err = stream_movies_by_genre_db(genre_id, cursor, fields)
+        if err:
+            return jsonify({"error": err}), 500
+        return stream_rows(movies, stream_mode)
+
+    page, err = get_movies_by_genre_db(genre_id, limit, cursor, fields)
     if err:
         return jsonify({"error": err}), 500
-    if not movies:
+    if not page:
         return jsonify({"message": f"No movies found for genre {genre_id}"}), 404
-    return jsonify([dict(movie) for movie in movies]),200
+    return jsonify(page), 200
 
 # Platforms CRUD operations
 
 @movies_bp.route('/platforms/', methods=['GET'])
+@conditional(cached_version(platform_cache, ALL_PLATFORMS_KEY, get_platforms), PLATFORMS_CACHE_CONTROL)
 def get_all_platforms_route():
     """Gets all platforms"""
+    fields, err = get_fields_arg(PLATFORM_FIELDS)
+    if err:
+        return jsonify({"error": err}), 400
+
     platforms, err = get_platforms()
     if err:
         return jsonify({"error": err}), 500
-    return jsonify([dict(p) for p in platforms]), 200
+    return jsonify([project(p, fields) for p in platforms]), 200
 
 
 @movies_bp.route('/platforms/<int:platform_id>', methods=['GET'])
+@conditional(cached_version(platform_cache, lambda platform_id: platform_id, get_platform_by_id), PLATFORMS_CACHE_CONTROL)
 def get_platform_route(platform_id):
     """Gets a single platform by its ID"""
+    fields, err = get_fields_arg(PLATFORM_FIELDS)
+    if err:
+        return jsonify({"error": err}), 400
+
     platform, err = get_platform_by_id(platform_id)
     if err:
         if err == "Platform not found":
             return jsonify({"message": err}), 404
         return jsonify({"error": err}), 500
-    return jsonify(dict(platform)), 200
+    return jsonify(project(platform, fields)), 200
 
 
 @movies_bp.route('/platforms/', methods=['POST'])
@@ -120,7 +263,7 @@ def create_platform_route():
     new_platform, err = create_platform(data)
     if err:
         return jsonify({"error": err}), 400
-    return jsonify(dict(new_platform)), 201
+    return jsonify(new_platform), 201
 
 
 @movies_bp.route('/platforms/<int:platform_id>', methods=['PUT', 'PATCH'])
@@ -137,7 +280,7 @@ def update_platform_route(platform_id):
             return jsonify({"message": err}), 404
         return jsonify({"error": err}), 400
         
-    return jsonify(dict(updated)), 200
+    return jsonify(updated), 200
 
 
 @movies_bp.route('/platforms/<int:platform_id>', methods=['DELETE'])
@@ -150,4 +293,4 @@ def delete_platform_route(platform_id):
             return jsonify({"message": err}), 404
         return jsonify({"error": err}), 500
         
-    return jsonify(dict(deleted)), 200
+    return jsonify(deleted), 200
@@ -12,7 +12,7 @@ def get_users():
             "SELECT * FROM users",
             fetch=True
         )
-        return jsonify([dict(user) for user in users])
+        return jsonify(users)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -27,7 +27,7 @@ def get_user(user_id):
             fetch=True
         )
         if user:
-            return jsonify(dict(user[0]))
+            return jsonify(user[0])
         return jsonify({'error': 'User not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
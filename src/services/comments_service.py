@@ -1,19 +1,70 @@
-from src.config.database import execute_query
+from src.config.database import execute_query, stream_query, transaction
+from src.utils.bulk import validate_records, reject_missing_references, bulk_result, is_int, write_rows
+from src.utils.vote_buffer import get_comment_vote_buffer
+from src.utils.multiget import order_by_ids
+from src.utils.fields import select_columns
+from src.utils.pagination import build_page
 
 
-def get_all_comments():
-    """Gets all comments"""
+# Columns clients may request with ?fields=, and the ones always selected
+COMMENT_FIELDS = ('id', 'user_id', 'movie_id', 'body', 'rating', 'created_at', 'comment_likes', 'comment_dislikes')
+COMMENT_KEY_FIELDS = ('id', 'created_at')
+
+
+def get_all_comments(limit, cursor=None, fields=None):
+    """Gets one page of comments, newest first, ordered by (created_at, id)"""
     try:
-        comments = execute_query("SELECT * FROM comments ORDER BY created_at DESC", fetch=True)
-        return comments, None
+        where = ""
+        params = []
+        if cursor:
+            where = "WHERE (created_at, id) < (%s, %s)"
+            params.extend(cursor)
+        params.append(limit + 1)
+
+        comments = execute_query(
+            f"""
+            SELECT {select_columns(fields, COMMENT_FIELDS, COMMENT_KEY_FIELDS)} FROM comments
+            {where}
+            ORDER BY created_at DESC, id DESC
+            LIMIT %s
+            """,
+            tuple(params),
+            fetch=True
+        )
+        return build_page(comments, limit, ('created_at', 'id')), None
     except Exception as e:
         return None, str(e)
     
     
-def get_comment_by_id(comment_id):
+def stream_all_comments(cursor=None, fields=None):
+    """Streams all comments, newest first, starting after the cursor"""
+    where = ""
+    params = []
+    if cursor:
+        where = "WHERE (created_at, id) < (%s, %s)"
+        params.extend(cursor)
+
+    try:
+        comments = stream_query(
+            f"""
+            SELECT {select_columns(fields, COMMENT_FIELDS, COMMENT_KEY_FIELDS)} FROM comments
+            {where}
+            ORDER BY created_at DESC, id DESC
+            """,
+            tuple(params)
+        )
+        return comments, None
+    except Exception as e:
+        return None, str(e)
+
+
+def get_comment_by_id(comment_id, fields=None):
     """Gets a single comment by its ID"""
     try:
-        comment = execute_query("SELECT * FROM comments WHERE id = %s", (comment_id,), fetch=True)
+        comment = execute_query(
+            f"SELECT {select_columns(fields, COMMENT_FIELDS)} FROM comments WHERE id = %s",
+            (comment_id,), fetch=True
+        )
         if comment:
             return comment[0], None
         return None, "Comment not found"
@@ -21,8 +72,50 @@ def get_comment_by_id(comment_id):
         return None, str(e)
     
     
+# Applies a rating change to the movie's statistic row. Used as the last CTE of
+# every comment write, it expects a preceding `delta(movie_id, old_rating, new_rating)`
+# CTE. Adding a rating is old NULL -> new, removing one is old -> new NULL.
+STATISTIC_DELTA_CTE = """
+    stat AS (
+        UPDATE statistic
+        SET
+            vote_count = COALESCE(statistic.vote_count, 0) + per_movie.added,
+            vote_avg = CASE
+                        WHEN COALESCE(statistic.vote_count, 0) + per_movie.added > 0
+                        THEN ( (COALESCE(statistic.vote_avg, 0) * COALESCE(statistic.vote_count, 0))
+                               + per_movie.total )
+                             / ( COALESCE(statistic.vote_count, 0) + per_movie.added )
+                        ELSE 0
+                       END
+        FROM (
+            -- `delta` may hold several comments of one movie; an UPDATE ... FROM
+            -- applies only one matching row, so they are summed per movie first
+            SELECT movie_id,
+                   SUM((new_rating IS NOT NULL)::int - (old_rating IS NOT NULL)::int) AS added,
+                   SUM(COALESCE(new_rating, 0) - COALESCE(old_rating, 0)) AS total
+            FROM delta
+            WHERE old_rating IS DISTINCT FROM new_rating
+            GROUP BY movie_id
+        ) AS per_movie
+        WHERE statistic.movie_id = per_movie.movie_id
+    )
+"""
+
+
+def get_comments_by_ids(ids, fields=None):
+    """Gets several comments by ID in one query, in the order of ids"""
+    try:
+        comments = execute_query(
+            f"SELECT {select_columns(fields, COMMENT_FIELDS)} FROM comments WHERE id = ANY(%s)",
+            (ids,), fetch=True
+        )
+        return order_by_ids(comments, ids), None
+    except Exception as e:
+        return None, str(e)
+
+
 def create_comment(comment_data):
-    """Creates a new comment AND updates the movie's average rating"""
+    """Creates a new comment AND updates the movie's average rating in one statement"""
     try:
         user_id = comment_data.get('user_id')
         movie_id = comment_data.get('movie_id')
@@ -32,10 +125,17 @@ def create_comment(comment_data):
         comment_dislikes = comment_data.get('comment_dislikes', 0)
 
         new_comment_list = execute_query(
-            """
-            INSERT INTO comments (user_id, movie_id, body, rating, comment_likes, comment_dislikes)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            RETURNING *
+            f"""
+            WITH new_comment AS (
+                INSERT INTO comments (user_id, movie_id, body, rating, comment_likes, comment_dislikes)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                RETURNING *
+            ),
+            delta AS (
+                SELECT movie_id, NULL::integer AS old_rating, rating AS new_rating FROM new_comment
+            ),
+            {STATISTIC_DELTA_CTE}
+            SELECT * FROM new_comment
             """,
             (user_id, movie_id, body, rating, comment_likes, comment_dislikes),
             fetch=True
@@ -43,39 +143,14 @@ def create_comment(comment_data):
         
         if not new_comment_list:
             return None, "Failed to create comment"
-
-        new_comment = new_comment_list[0]
-
-        if rating is not None:
-            try:
-                execute_query(
-                    """
-                    UPDATE statistic
-                    SET 
-                        vote_count = COALESCE(vote_count, 0) + 1,
-                        vote_avg = ( (COALESCE(vote_avg, 0) * COALESCE(vote_count, 0)) + %s ) / (COALESCE(vote_count, 0) + 1)
-                    WHERE movie_id = %s
-                    """,
-                    (rating, movie_id)
-                )
-            except Exception as e:
-                print(f"WARNING: Comment {new_comment['id']} created, but failed to update rating statistics for movie {movie_id}. Error: {e}")
-
-        return new_comment, None
+        return new_comment_list[0], None
     except Exception as e:
         return None, str(e)
     
 
 def update_comment(comment_id, comment_data):
-    """Updates an existing comment AND recalculates the movie's average rating"""
+    """Updates an existing comment AND recalculates the movie's average rating in one statement"""
     try:
-        comment_check, err = get_comment_by_id(comment_id)
-        if err:
-            return None, err
-        
-        old_rating = comment_check.get('rating')
-        movie_id = comment_check.get('movie_id') 
-
         update_fields = []
         params = []
         
@@ -87,87 +162,140 @@ def update_comment(comment_id, comment_data):
             params.append(comment_data['rating'])
         
         if not update_fields:
-            return comment_check, None 
+            return get_comment_by_id(comment_id)
 
-        params.append(comment_id)
-        
+        # The old row is locked first so concurrent updates see each other's rating
         query = f"""
-            UPDATE comments
-            SET {', '.join(update_fields)}
-            WHERE id = %s
-            RETURNING *
+            WITH old AS (
+                SELECT id, rating FROM comments WHERE id = %s FOR UPDATE
+            ),
+            updated AS (
+                UPDATE comments
+                SET {', '.join(update_fields)}
+                FROM old
+                WHERE comments.id = old.id
+                RETURNING comments.*
+            ),
+            delta AS (
+                SELECT updated.movie_id, old.rating AS old_rating, updated.rating AS new_rating
+                FROM updated JOIN old ON old.id = updated.id
+            ),
+            {STATISTIC_DELTA_CTE}
+            SELECT * FROM updated
         """
-        updated_comment_list = execute_query(query, tuple(params), fetch=True)
+        updated_comment_list = execute_query(query, (comment_id, *params), fetch=True)
         
         if not updated_comment_list:
-            return None, "Failed to update comment"
-        
-        updated_comment = updated_comment_list[0]
-        new_rating = comment_data.get('rating') 
-        
-        if new_rating is not None and new_rating != old_rating:
-            try:
-                execute_query(
-                    """
-                    UPDATE statistic
-                    SET 
-                        vote_avg = ( (COALESCE(vote_avg, 0) * COALESCE(vote_count, 0)) - COALESCE(%s, 0) + %s ) / COALESCE(vote_count, 1)
-                    WHERE movie_id = %s
-                    """,
-                    (old_rating, new_rating, movie_id)
-                )
-            except Exception as e:
-                print(f"WARNING: Comment {comment_id} updated, but failed to *recalculate* statistics for movie {movie_id}. Error: {e}")
-
-        return updated_comment, None
+            return None, "Comment not found"
+        _forget_buffered_comment(comment_id)
+        return updated_comment_list[0], None
     except Exception as e:
         return None, str(e)
     
     
 def delete_comment_by_id(comment_id):
-    """Deletes a comment AND updates the movie's average rating"""
+    """Deletes a comment AND updates the movie's average rating in one statement"""
     try:
-        comment, err = get_comment_by_id(comment_id)
-        if err:
-            return None, err
-        
-        rating = comment.get('rating')
-        movie_id = comment.get('movie_id')
-
-        deleted = execute_query("DELETE FROM comments WHERE id = %s RETURNING *", (comment_id,), fetch=True)
+        deleted = execute_query(
+            f"""
+            WITH deleted AS (
+                DELETE FROM comments WHERE id = %s RETURNING *
+            ),
+            delta AS (
+                SELECT movie_id, rating AS old_rating, NULL::integer AS new_rating FROM deleted
+            ),
+            {STATISTIC_DELTA_CTE}
+            SELECT * FROM deleted
+            """,
+            (comment_id,),
+            fetch=True
+        )
         
         if not deleted:
-            return None, "Comment not found to delete"
-        
-        if rating is not None:
-            try:
-                execute_query(
-                    """
-                    UPDATE statistic
-                    SET 
-                        vote_count = COALESCE(vote_count, 1) - 1,
-                        vote_avg = CASE 
-                                    WHEN (COALESCE(vote_count, 1) - 1) > 0 
-                                    THEN ( (COALESCE(vote_avg, 0) * COALESCE(vote_count, 1)) - %s ) / (COALESCE(vote_count, 1) - 1)
-                                    ELSE 0
-                                   END
-                    WHERE movie_id = %s
-                    """,
-                    (rating, movie_id)
-                )
-            except Exception as e:
-                print(f"WARNING: Comment {comment_id} deleted, but failed to update rating statistics. Error: {e}")
-        
+            return None, "Comment not found"
+        _forget_buffered_comment(comment_id)
         return deleted[0], None
     except Exception as e:
         return None, str(e)
 
 
-def get_comments_for_movie(movie_id):
+def _check_bulk_comment(comment):
+    for field in ('user_id', 'movie_id'):
+        if not is_int(comment[field]):
+            return f"{field} must be an integer"
+    rating = comment.get('rating')
+    if rating is not None and (not is_int(rating) or not 0 <= rating <= 10):
+        return "rating must be an integer between 0 and 10"
+    return None
+
+
+def bulk_create_comments(records):
+    """Creates many comments in one transaction and updates each affected movie's statistic once.
+
+    Returns a per-row result of ids and validation errors.
+    """
+    try:
+        valid, errors = validate_records(records, ('user_id', 'movie_id', 'body'), _check_bulk_comment)
+
+        with transaction() as cursor:
+            for field, table, label in (('movie_id', 'movies', "Movie"), ('user_id', 'users', "User")):
+                wanted = list({comment[field] for _, comment in valid})
+                if wanted:
+                    cursor.execute(f"SELECT id FROM {table} WHERE id = ANY(%s)", (wanted,))
+                    existing = {row['id'] for row in cursor.fetchall()}
+                    valid = reject_missing_references(valid, errors, field, existing, label)
+
+            if not valid:
+                return bulk_result([], errors), None
+
+            # Ids are drawn up front and assigned here, so each result maps to
+            # its record without relying on the order of RETURNING rows
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence('comments', 'id')) AS id FROM generate_series(1, %s)",
+                (len(valid),)
+            )
+            ids = {index: row['id'] for (index, _), row in zip(valid, cursor.fetchall())}
+
+            # One statistic update per movie instead of one per comment
+            written = write_rows(
+                cursor,
+                f"""
+                WITH inserted AS (
+                    INSERT INTO comments (id, user_id, movie_id, body, rating, comment_likes, comment_dislikes)
+                    VALUES %s
+                    RETURNING movie_id, rating
+                ),
+                delta AS (
+                    SELECT movie_id, NULL::integer AS old_rating, rating AS new_rating FROM inserted
+                ),
+                {STATISTIC_DELTA_CTE}
+                SELECT 1
+                """,
+                [
+                    (index, (
+                        ids[index],
+                        comment['user_id'],
+                        comment['movie_id'],
+                        comment['body'],
+                        comment.get('rating'),
+                        comment.get('comment_likes', 0),
+                        comment.get('comment_dislikes', 0)
+                    ))
+                    for index, comment in valid
+                ],
+                errors
+            )
+
+        return bulk_result([(index, ids[index]) for index in written], errors), None
+    except Exception as e:
+        return None, str(e)
+
+
+def get_comments_for_movie(movie_id, fields=None):
     """Gets all comments for a specific movie"""
     try:
         comments = execute_query(
-            "SELECT * FROM comments WHERE movie_id = %s ORDER BY created_at DESC",
+            f"SELECT {select_columns(fields, COMMENT_FIELDS)} FROM comments WHERE movie_id = %s ORDER BY created_at DESC",
             (movie_id,), fetch=True
         )
         if comments:
@@ -198,8 +326,74 @@ def get_comments_for_movie_sorted(movie_id, sort_order="DESC"):
         return None, str(e)
 
 
+def get_movie_ratings(movie_id):
+    """Gets the rating distribution and exact mean of a movie from movie_rating_stats"""
+    try:
+        stats = execute_query(
+            """
+            SELECT m.id AS movie_id, s.rating_count, s.rating_sum, s.histogram
+            FROM movies m
+            LEFT JOIN movie_rating_stats s ON s.movie_id = m.id
+            WHERE m.id = %s
+            """,
+            (movie_id,), fetch=True
+        )
+        if not stats:
+            return None, "Movie not found"
+
+        row = stats[0]
+        count = row['rating_count'] or 0
+        total = row['rating_sum'] or 0
+        histogram = row['histogram'] or [0] * 11
+        return {
+            'movie_id': row['movie_id'],
+            'count': count,
+            'sum': total,
+            'mean': total / count if count else None,
+            'distribution': {str(rating): n for rating, n in enumerate(histogram)}
+        }, None
+    except Exception as e:
+        return None, str(e)
+
+
+def rebuild_rating_stats():
+    """Recomputes movie_rating_stats from the comments table in bulk"""
+    try:
+        with transaction() as cursor:
+            cursor.execute("SELECT rebuild_movie_rating_stats() AS rebuilt")
+            return cursor.fetchone()['rebuilt'], None
+    except Exception as e:
+        return None, str(e)
+
+
+def _forget_buffered_comment(comment_id):
+    buffer = get_comment_vote_buffer()
+    if buffer is not None:
+        buffer.forget(comment_id)
+
+
+def _load_comment(comment_id):
+    comment = execute_query("SELECT * FROM comments WHERE id = %s", (comment_id,), fetch=True)
+    return comment[0] if comment else None
+
+
+def _buffer_comment_vote(buffer, comment_id, likes=0, dislikes=0):
+    """Queues a vote and returns the comment with its projected counts"""
+    try:
+        projected = buffer.vote(comment_id, _load_comment, likes=likes, dislikes=dislikes)
+    except Exception as e:
+        return None, str(e)
+    if projected is None:
+        return None, "Comment not found"
+    return projected, None
+
+
 def like_comment(comment_id):
     """Increments the 'comment_likes' count"""
+    buffer = get_comment_vote_buffer()
+    if buffer is not None:
+        return _buffer_comment_vote(buffer, comment_id, likes=1)
+
     try:
         updated = execute_query(
             "UPDATE comments SET comment_likes = comment_likes + 1 WHERE id = %s RETURNING *",
@@ -214,6 +408,10 @@ def like_comment(comment_id):
 
 def dislike_comment(comment_id):
     """Increments the 'comment_dislikes' count"""
+    buffer = get_comment_vote_buffer()
+    if buffer is not None:
+        return _buffer_comment_vote(buffer, comment_id, dislikes=1)
+
     try:
         updated = execute_query(
             "UPDATE comments SET comment_dislikes = comment_dislikes + 1 WHERE id = %s RETURNING *",
@@ -1,27 +1,157 @@
-from src.config.database import execute_query
+from src.config.database import execute_query, stream_query, transaction
+from src.utils.pagination import build_page
+from src.utils.cache import movie_cache, genre_cache, platform_cache, ALL_PLATFORMS_KEY
+from src.utils.multiget import order_by_ids
+from src.utils.fields import select_columns, selected_columns, project
+from src.utils.bulk import validate_records, reject_missing_references, bulk_result, reject_duplicates, is_int, write_rows
 
-def get_movies_db():
-    """Get all movies"""
+# Columns clients may request with ?fields=, and the ones always selected
+MOVIE_FIELDS = ('id', 'title', 'overview', 'tagline', 'release_date', 'poster_file', 'banner_file', 'platform_id')
+MOVIE_KEY_FIELDS = ('id', 'title')
+PLATFORM_FIELDS = ('id', 'platform_name', 'logo_path')
+
+
+def get_movies_db(limit: int, cursor=None, fields=None):
+    """Get one page of movies ordered by (title, id)"""
     try:
+        where = ""
+        params = []
+        if cursor:
+            where = "WHERE (title, id) > (%s, %s)"
+            params.extend(cursor)
+        params.append(limit + 1)
+
         movies = execute_query(
-            """
-            SELECT id, title, overview, tagline, release_date, poster_file, banner_file, platform_id 
+            f"""
+            SELECT {select_columns(fields, MOVIE_FIELDS, MOVIE_KEY_FIELDS)}
             FROM movies
-            ORDER BY title
+            {where}
+            ORDER BY title, id
+            LIMIT %s
             """,
+            tuple(params),
             fetch=True
         )
+        return build_page(movies, limit, ('title', 'id')), None
+    except Exception as e:
+        return None, str(e)
+
+
+def stream_movies_db(cursor=None, fields=None):
+    """Stream all movies ordered by (title, id), starting after the cursor"""
+    where = ""
+    params = []
+    if cursor:
+        where = "WHERE (title, id) > (%s, %s)"
+        params.extend(cursor)
+
+    try:
+        movies = stream_query(
+            f"""
+            SELECT {select_columns(fields, MOVIE_FIELDS, MOVIE_KEY_FIELDS)}
+            FROM movies
+            {where}
+            ORDER BY title, id
+            """,
+            tuple(params)
+        )
         return movies, None
     except Exception as e:
         return None, str(e)
 
 
-def get_movie_by_id_db(id: int):
-    """Get movie by id"""
+def get_movies_by_ids_db(ids: list, fields=None, min_versions=None):
+    """Get several movies by id in one query, in the order of ids; cached movies skip the query.
+
+    `min_versions` maps ids to the updated_at a cached copy must have.
+    """
+    try:
+        min_versions = min_versions or {}
+        found = []
+        uncached = []
+        for movie_id in ids:
+            cached = movie_cache.get(movie_id, min_versions.get(movie_id))
+            if cached is not None:
+                found.append(cached)
+            else:
+                uncached.append(movie_id)
+
+        if uncached:
+            # Full rows are fetched only to fill the cache, with their
+            # updated_at as the version; with ?fields= just the requested
+            # columns are read and nothing is cached
+            if fields is None:
+                movies = execute_query(
+                    f"SELECT {select_columns(None, MOVIE_FIELDS)}, updated_at FROM movies WHERE id = ANY(%s)",
+                    (uncached,),
+                    fetch=True
+                )
+                for movie in movies:
+                    movie_cache.set(movie['id'], movie, version=movie.pop('updated_at'))
+            else:
+                movies = execute_query(
+                    f"SELECT {select_columns(fields, MOVIE_FIELDS)} FROM movies WHERE id = ANY(%s)",
+                    (uncached,),
+                    fetch=True
+                )
+            found.extend(movies)
+
+        found = [project(movie, fields) for movie in found]
+        return order_by_ids(found, ids), None
+    except Exception as e:
+        return None, str(e)
+
+
+def search_movies_db(q: str, limit: int, cursor=None):
+    """Full-text search over title, tagline and overview, best matches first"""
+    try:
+        keyset = ""
+        params = [q]
+        if cursor:
+            # rank DESC, id ASC
+            keyset = "WHERE hits.rank < %s OR (hits.rank = %s AND movies.id > %s)"
+            params.extend([cursor[0], cursor[0], cursor[1]])
+        params.append(limit + 1)
+
+        movies = execute_query(
+            f"""
+            WITH query AS (
+                SELECT websearch_to_tsquery('english', %s) AS q
+            ),
+            hits AS (
+                SELECT movies.id, ts_rank_cd(movies.search_vector, query.q)::float8 AS rank
+                FROM movies, query
+                WHERE movies.search_vector @@ query.q
+            )
+            SELECT movies.id, movies.title, movies.tagline, movies.release_date, movies.poster_file, movies.platform_id,
+                   hits.rank,
+                   ts_headline('english', COALESCE(movies.overview, ''), query.q,
+                               'StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15, MaxFragments=2') AS snippet
+            FROM hits
+            JOIN movies ON movies.id = hits.id
+            CROSS JOIN query
+            {keyset}
+            ORDER BY hits.rank DESC, movies.id
+            LIMIT %s
+            """,
+            tuple(params),
+            fetch=True
+        )
+        return build_page(movies, limit, ('rank', 'id')), None
+    except Exception as e:
+        return None, str(e)
+
+
+def get_movie_by_id_db(id: int, min_version=None):
+    """Get movie by id; a cached copy older than `min_version` (an updated_at) is refetched"""
+    cached = movie_cache.get(id, min_version)
+    if cached is not None:
+        return cached, None
+
     try:
         movies = execute_query(
             """
-            SELECT id, title, overview, tagline, release_date, poster_file, banner_file, platform_id 
+            SELECT id, title, overview, tagline, release_date, poster_file, banner_file, platform_id, updated_at
             FROM movies
             WHERE id = %s
             """,
@@ -29,7 +159,99 @@ def get_movie_by_id_db(id: int):
             fetch=True
         )
         if movies:
-            return movies[0], None 
+            movie = movies[0]
+            movie_cache.set(id, movie, version=movie.pop('updated_at'))
+            return movie, None
+        return None, "Movie not found"
+    except Exception as e:
+        return None, str(e)
+
+
+# Sections of GET /movies/<id>/full. Each one is a correlated subquery on `m`
+# returning JSON, so the whole page is still a single query.
+MOVIE_FULL_SECTIONS = {
+    'platform': (
+        """
+        (SELECT row_to_json(p) FROM (
+            SELECT id, platform_name, logo_path FROM platforms WHERE id = m.platform_id
+        ) p) AS platform
+        """,
+        False
+    ),
+    'genres': (
+        """
+        (SELECT COALESCE(json_agg(json_build_object('id', g.id, 'genre_name', g.genre_name) ORDER BY g.genre_name), '[]'::json)
+         FROM movies_genres mg
+         JOIN genres g ON g.id = mg.genre_id
+         WHERE mg.movie_id = m.id) AS genres
+        """,
+        False
+    ),
+    'cast': (
+        """
+        (SELECT COALESCE(json_agg(json_build_object(
+                    'person_id', c.person_id, 'name', c.name, 'photo_url', c.photo_url,
+                    'role', c.role, 'character_name', c.character_name) ORDER BY c.billing), '[]'::json)
+         FROM (
+            SELECT mc.id AS billing, p.id AS person_id, p.name, p.photo_url, mc.role, mc.character_name
+            FROM movie_cast mc
+            JOIN people p ON p.id = mc.person_id
+            WHERE mc.movie_id = m.id
+            ORDER BY mc.id
+            LIMIT %s
+         ) c) AS "cast"
+        """,
+        True
+    ),
+    'statistics': (
+        """
+        (SELECT row_to_json(s) FROM (
+            SELECT revenue, runtime, vote_avg, vote_count, budget FROM statistic WHERE movie_id = m.id
+        ) s) AS statistics
+        """,
+        False
+    ),
+    'comments': (
+        """
+        (SELECT COALESCE(json_agg(c ORDER BY c.created_at DESC, c.id DESC), '[]'::json)
+         FROM (
+            SELECT * FROM comments
+            WHERE movie_id = m.id
+            ORDER BY created_at DESC, id DESC
+            LIMIT %s
+         ) c) AS comments
+        """,
+        True
+    )
+}
+
+
+def get_movie_full_db(id: int, include, cast_limit: int, comments_limit: int):
+    """Get a movie together with the requested sections in one query"""
+    try:
+        columns = []
+        params = []
+        limits = {'cast': cast_limit, 'comments': comments_limit}
+        for section in include:
+            sql, takes_limit = MOVIE_FULL_SECTIONS[section]
+            columns.append(sql)
+            if takes_limit:
+                params.append(limits[section])
+        params.append(id)
+
+        extra = "".join(f",\n{column}" for column in columns)
+        movies = execute_query(
+            f"""
+            SELECT m.id, m.title, m.overview, m.tagline, m.release_date, m.poster_file, m.banner_file, m.platform_id
+            {extra}
+            FROM movies m
+            WHERE m.id = %s
+            """,
+            tuple(params),
+            fetch=True
+        )
+        if movies:
+            return movies[0], None
         return None, "Movie not found"
     except Exception as e:
         return None, str(e)
@@ -94,13 +316,79 @@ def update_movie_db(id: int, movie_data: dict):
             tuple(params),
             fetch=True
         )
+        movie_cache.invalidate(id)
 
+        if not updated_movie:
+            return None, "Movie not found"
         return updated_movie[0], None
 
     except Exception as e:
         return None, str(e)
 
 
+def _check_bulk_movie(movie):
+    if not is_int(movie['id']):
+        return "id must be an integer"
+    if movie.get('platform_id') is not None and not is_int(movie['platform_id']):
+        return "platform_id must be an integer"
+    return None
+
+
+def bulk_upsert_movies_db(records: list):
+    """Insert or replace many movies by id in one transaction.
+
+    Returns a per-row result of ids and validation errors.
+    """
+    try:
+        valid, errors = validate_records(records, ('id', 'title'), _check_bulk_movie)
+        valid = reject_duplicates(valid, errors, 'id')
+
+        with transaction() as cursor:
+            platform_ids = list({movie['platform_id'] for _, movie in valid if movie.get('platform_id') is not None})
+            if platform_ids:
+                cursor.execute("SELECT id FROM platforms WHERE id = ANY(%s)", (platform_ids,))
+                existing = {row['id'] for row in cursor.fetchall()}
+                valid = reject_missing_references(valid, errors, 'platform_id', existing, "Platform")
+
+            written = write_rows(
+                cursor,
+                """
+                INSERT INTO movies (id, title, overview, tagline, release_date, poster_file, banner_file, platform_id)
+                VALUES %s
+                ON CONFLICT (id) DO UPDATE
+                SET title = EXCLUDED.title,
+                    overview = EXCLUDED.overview,
+                    tagline = EXCLUDED.tagline,
+                    release_date = EXCLUDED.release_date,
+                    poster_file = EXCLUDED.poster_file,
+                    banner_file = EXCLUDED.banner_file,
+                    platform_id = EXCLUDED.platform_id
+                """,
+                [
+                    (index, (
+                        movie['id'],
+                        movie['title'],
+                        movie.get('overview'),
+                        movie.get('tagline'),
+                        movie.get('release_date'),
+                        movie.get('poster_file'),
+                        movie.get('banner_file'),
+                        movie.get('platform_id')
+                    ))
+                    for index, movie in valid
+                ],
+                errors
+            )
+
+        # ids are the records' own keys, so results never depend on row order
+        records_by_index = dict(valid)
+        ids = [records_by_index[index]['id'] for index in written]
+        movie_cache.invalidate(*ids)
+        return bulk_result(list(zip(written, ids)), errors), None
+    except Exception as e:
+        return None, str(e)
+
+
 def delete_movie_db(id: int):
     """Delete a movie by id"""
     try:
@@ -113,6 +401,7 @@ def delete_movie_db(id: int):
             (id,),
             fetch=True
         )
+        movie_cache.invalidate(id)
 
         if deleted_movie:
             return deleted_movie[0], None
@@ -123,6 +412,9 @@ def delete_movie_db(id: int):
 
 def get_genres_by_id_db(id:int):
     """Get genres by id"""
+    cached = genre_cache.get(id)
+    if cached is not None:
+        return cached, None
 
     try:
         genres = execute_query(
@@ -134,46 +426,123 @@ def get_genres_by_id_db(id:int):
         (id,),
         fetch=True)
         if genres:
+            genre_cache.set(id, genres[0])
             return genres[0], None
         return None, "Genre not found"
     except Exception as e:
         return None, str(e)
     
-def get_movies_by_genre_db(genre_id: int):
-    """Get movies by genre ID"""
+def _genre_movie_columns(fields):
+    """SELECT list of the genre listings, which return movies.id as movie_id"""
+    return ', '.join(
+        'movies.id AS movie_id' if column == 'id' else f'movies.{column}'
+        for column in selected_columns(fields, MOVIE_FIELDS, MOVIE_KEY_FIELDS)
+    )
+
+
+def get_movies_by_genre_db(genre_id: int, limit: int, cursor=None, fields=None):
+    """Get one page of movies by genre ID ordered by (title, id)"""
     try:
         genre, err = get_genres_by_id_db(genre_id)
         if err:
             return None, err
         if not genre:
             return None, "Genre not found"
-        
+
+        keyset = ""
+        params = [genre_id]
+        if cursor:
+            keyset = "AND (movies.title, movies.id) > (%s, %s)"
+            params.extend(cursor)
+        params.append(limit + 1)
+
         movies = execute_query(
-            """
-            SELECT movies.id AS movie_id, movies.title, movies.overview, movies.tagline, movies.release_date, movies.poster_file, movies.banner_file, movies.platform_id
+            f"""
+            SELECT {_genre_movie_columns(fields)}
             FROM movies, movies_genres
             WHERE movies.id = movies_genres.movie_id
               AND movies_genres.genre_id = %s
-            ORDER BY movies.title
+              {keyset}
+            ORDER BY movies.title, movies.id
+            LIMIT %s
             """,
-            (genre_id,),
+            tuple(params),
             fetch=True
         )
         if movies:
-            return movies, None
+            return build_page(movies, limit, ('title', 'movie_id')), None
         return None, "No movies in this genre"
     except Exception as e:
         return None, str(e)
     
+def stream_movies_by_genre_db(genre_id: int, cursor=None, fields=None):
+    """Stream all movies of a genre ordered by (title, id), starting after the cursor"""
+    genre, err = get_genres_by_id_db(genre_id)
+    if err:
+        return None, err
+
+    keyset = ""
+    params = [genre_id]
+    if cursor:
+        keyset = "AND (movies.title, movies.id) > (%s, %s)"
+        params.extend(cursor)
+
+    try:
+        movies = stream_query(
+            f"""
+            SELECT {_genre_movie_columns(fields)}
+            FROM movies, movies_genres
+            WHERE movies.id = movies_genres.movie_id
+              AND movies_genres.genre_id = %s
+              {keyset}
+            ORDER BY movies.title, movies.id
+            """,
+            tuple(params)
+        )
+        return movies, None
+    except Exception as e:
+        return None, str(e)
+
+def get_image_references_db():
+    """Gets the image file names referenced by movies and platforms, for the image manifest audit"""
+    try:
+        movies = execute_query(
+            "SELECT id, poster_file, banner_file FROM movies ORDER BY id",
+            fetch=True
+        )
+        platforms = execute_query(
+            "SELECT id, logo_path FROM platforms ORDER BY id",
+            fetch=True
+        )
+        return {'movies': movies, 'platforms': platforms}, None
+    except Exception as e:
+        return None, str(e)
+
+
 # Platforms CRUD operations
 
 def get_platforms():
     """Gets all platforms"""
+    cached = platform_cache.get(ALL_PLATFORMS_KEY)
+    if cached is not None:
+        return cached, None
+
     try:
-        platforms = execute_query(
-            "SELECT id, platform_name, logo_path FROM platforms ORDER BY platform_name ASC",
+        # One statement, so the list and the 'platforms' change time (the
+        # cache version behind the ETag) come from the same snapshot
+        result = execute_query(
+            """
+            SELECT (SELECT changed_at FROM row_versions WHERE scope = 'platforms') AS changed_at,
+                   COALESCE(
+                       (SELECT json_agg(p ORDER BY p.platform_name ASC)
+                        FROM (SELECT id, platform_name, logo_path FROM platforms) p),
+                       '[]'
+                   ) AS platforms
+            """,
             fetch=True
-        )
+        )[0]
+        platforms = result['platforms']
+        platform_cache.set(ALL_PLATFORMS_KEY, platforms, version=result['changed_at'])
         return platforms, None
     except Exception as e:
         return None, str(e)
@@ -181,14 +550,25 @@ def get_platforms():
 
 def get_platform_by_id(platform_id):
     """Gets a single platform by its ID"""
+    cached = platform_cache.get(platform_id)
+    if cached is not None:
+        return cached, None
+
     try:
         platform = execute_query(
-            "SELECT id, platform_name, logo_path FROM platforms WHERE id = %s",
+            """
+            SELECT p.id, p.platform_name, p.logo_path, v.changed_at
+            FROM platforms p
+            LEFT JOIN row_versions v ON v.scope = 'platforms'
+            WHERE p.id = %s
+            """,
             (platform_id,),
             fetch=True
         )
         if platform:
-            return platform[0], None
+            platform = platform[0]
+            platform_cache.set(platform_id, platform, version=platform.pop('changed_at'))
+            return platform, None
         return None, "Platform not found"
     except Exception as e:
         return None, str(e)
@@ -209,6 +589,7 @@ def create_platform(platform_data):
             (platform_name, logo_path),
             fetch=True
         )
+        platform_cache.invalidate(ALL_PLATFORMS_KEY)
         if new_platform:
             return new_platform[0], None
         return None, "Failed to create platform"
@@ -248,6 +629,7 @@ def update_platform(platform_id, platform_data):
         """
         
         updated_platform = execute_query(query, tuple(params), fetch=True)
+        platform_cache.invalidate(platform_id, ALL_PLATFORMS_KEY)
         
         if updated_platform:
             return updated_platform[0], None
@@ -264,7 +646,10 @@ def delete_platform_by_id(platform_id):
             (platform_id,),
             fetch=True
         )
+        platform_cache.invalidate(platform_id, ALL_PLATFORMS_KEY)
+        # ON DELETE CASCADE removes the platform's movies as well
         if deleted_platform:
+            movie_cache.clear()
             return deleted_platform[0], None
         return None, "Platform not found"
     except Exception as e:
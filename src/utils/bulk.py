@@ -0,0 +1,132 @@
+import json
+import psycopg2
+from flask import current_app, request
+from psycopg2.extras import execute_values
+from src.utils.streaming import NDJSON_MIMETYPE
+
+
+def parse_bulk_body():
+    """Read a JSON array or an NDJSON request body.
+
+    Returns (records, err). Lines of an NDJSON body that are not valid JSON
+    become None so validation can report them by index.
+    """
+    if request.mimetype == NDJSON_MIMETYPE:
+        records = []
+        for line in request.get_data(as_text=True).splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                records.append(None)
+    else:
+        records = request.get_json(silent=True)
+        if not isinstance(records, list):
+            return None, "Expected a JSON array or an NDJSON body"
+
+    if not records:
+        return None, "No records provided"
+
+    max_rows = current_app.config['BULK_MAX_ROWS']
+    if len(records) > max_rows:
+        return None, f"At most {max_rows} records per request"
+    return records, None
+
+
+def validate_records(records, required, check=None):
+    """Validate every record in one pass.
+
+    `check(record)` may return an error message for resource specific rules.
+    Returns (valid, errors) where valid is a list of (index, record) and
+    errors a list of {'index', 'error'} dicts.
+    """
+    valid = []
+    errors = []
+    for index, record in enumerate(records):
+        if not isinstance(record, dict):
+            errors.append({'index': index, 'error': 'Record must be a JSON object'})
+            continue
+        missing = [field for field in required if record.get(field) is None]
+        if missing:
+            errors.append({'index': index, 'error': f"Missing required fields: {', '.join(missing)}"})
+            continue
+        err = check(record) if check else None
+        if err:
+            errors.append({'index': index, 'error': err})
+            continue
+        valid.append((index, record))
+    return valid, errors
+
+
+def reject_missing_references(valid, errors, field, existing_ids, label):
+    """Move records whose `field` points at a non-existing row from valid to errors"""
+    kept = []
+    for index, record in valid:
+        value = record.get(field)
+        if value is not None and value not in existing_ids:
+            errors.append({'index': index, 'error': f"{label} {value} does not exist"})
+        else:
+            kept.append((index, record))
+    return kept
+
+
+def reject_duplicates(valid, errors, field):
+    """Keep only the first record for each value of `field`; an upsert can't touch a row twice"""
+    seen = set()
+    kept = []
+    for index, record in valid:
+        if record[field] in seen:
+            errors.append({'index': index, 'error': f"Duplicate {field} {record[field]} in request"})
+        else:
+            seen.add(record[field])
+            kept.append((index, record))
+    return kept
+
+
+def is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+# Errors caused by the values of a record rather than by the statement or the
+# connection: bad dates, too long strings, wrong types, constraint violations
+REJECTED_ROW_ERRORS = (psycopg2.DataError, psycopg2.IntegrityError, psycopg2.ProgrammingError)
+
+
+def write_rows(cursor, query, rows, errors):
+    """Run an execute_values `query` over rows given as [(index, values)].
+
+    The batch runs under a savepoint. If the database rejects a value (an
+    unparseable date, a too long string, a constraint), it is retried row by
+    row, each under its own savepoint, so only the offending records become
+    errors. Returns the indexes that were written, in input order.
+    """
+    if not rows:
+        return []
+    cursor.execute("SAVEPOINT bulk_batch")
+    try:
+        execute_values(cursor, query, [values for _, values in rows], page_size=len(rows))
+        cursor.execute("RELEASE SAVEPOINT bulk_batch")
+        return [index for index, _ in rows]
+    except REJECTED_ROW_ERRORS:
+        cursor.execute("ROLLBACK TO SAVEPOINT bulk_batch")
+
+    written = []
+    for index, values in rows:
+        cursor.execute("SAVEPOINT bulk_row")
+        try:
+            execute_values(cursor, query, [values])
+            cursor.execute("RELEASE SAVEPOINT bulk_row")
+            written.append(index)
+        except REJECTED_ROW_ERRORS as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT bulk_row")
+            errors.append({'index': index, 'error': e.diag.message_primary or str(e)})
+    return written
+
+
+def bulk_result(written, errors):
+    """Merge written (index, id) pairs and errors into one per-row result list"""
+    results = [{'index': index, 'id': row_id} for index, row_id in written]
+    results.extend(errors)
+    results.sort(key=lambda result: result['index'])
+    return {'written': len(written), 'failed': len(errors), 'results': results}
@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Bounded, thread-safe LRU cache whose entries also expire after `ttl` seconds.
+
+    Entries may carry a version (e.g. the row's updated_at); get() with
+    `min_version` treats older or unversioned entries as misses.
+    """
+
+    def __init__(self, name, maxsize=1024, ttl=300):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale = 0
+
+    def configure(self, maxsize, ttl):
+        """Change size and TTL limits, dropping entries that no longer fit"""
+        with self._lock:
+            self.maxsize = maxsize
+            self.ttl = ttl
+            self._evict_overflow()
+
+    def get(self, key, min_version=None):
+        """Return the cached value for key, or None on a miss"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at, version = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            if min_version is not None and (version is None or version < min_version):
+                del self._data[key]
+                self.stale += 1
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def version(self, key):
+        """Version of a live entry, or None; not counted as a hit or miss"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                return None
+            return entry[2]
+
+    def set(self, key, value, version=None):
+        """Store a value; None is never cached so it can mean "miss" in get().
+
+        A versioned entry is not replaced by an older version, so a slow
+        read-through can't overwrite the row a newer one already cached.
+        """
+        if value is None or self.maxsize <= 0:
+            return
+        with self._lock:
+            current = self._data.get(key)
+            if current is not None and version is not None and current[2] is not None and current[2] > version:
+                return
+            self._data[key] = (value, time.monotonic() + self.ttl, version)
+            self._data.move_to_end(key)
+            self._evict_overflow()
+
+    def invalidate(self, *keys):
+        """Drop the given keys if present"""
+        with self._lock:
+            for key in keys:
+                if self._data.pop(key, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self.invalidations += len(self._data)
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'stale': self.stale
+            }
+
+    def _evict_overflow(self):
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+
+# Entity caches used by the services and routes
+movie_cache = TTLCache('movies')
+people_cache = TTLCache('people')
+genre_cache = TTLCache('genres')
+platform_cache = TTLCache('platforms')
+
+CACHES = {cache.name: cache for cache in (movie_cache, people_cache, genre_cache, platform_cache)}
+
+# Key under which platform_cache keeps the full platform list
+ALL_PLATFORMS_KEY = 'all'
+
+
+def configure_caches(config):
+    """Apply CACHE_* settings from the Flask config to every entity cache"""
+    for cache in CACHES.values():
+        cache.configure(config['CACHE_MAX_ENTRIES'], config['CACHE_TTL_SECONDS'])
+
+
+def get_cache_stats():
+    return {name: cache.stats() for name, cache in CACHES.items()}
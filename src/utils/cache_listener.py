@@ -0,0 +1,97 @@
+import json
+import select
+import threading
+import time
+import psycopg2
+from src.utils.cache import CACHES, platform_cache, ALL_PLATFORMS_KEY
+
+
+# Channel written by the notify_cache_invalidation() trigger (migration 0002)
+CHANNEL = 'cache_invalidation'
+
+# Maps table names in notification payloads to the cache holding their rows
+TABLE_CACHES = {
+    'movies': CACHES['movies'],
+    'people': CACHES['people'],
+    'genres': CACHES['genres'],
+    'platforms': CACHES['platforms']
+}
+
+_listener_thread = None
+_listener_lock = threading.Lock()
+
+
+def flush_all_caches():
+    for cache in CACHES.values():
+        cache.clear()
+
+
+def handle_notification(payload):
+    """Evict the cache entry named by one notification payload"""
+    try:
+        message = json.loads(payload)
+        cache = TABLE_CACHES.get(message['table'])
+        row_id = message['id']
+    except (ValueError, KeyError, TypeError):
+        # Unknown payload, be safe rather than serve stale rows
+        flush_all_caches()
+        return
+
+    if cache is None:
+        return
+    cache.invalidate(row_id)
+    if cache is platform_cache:
+        platform_cache.invalidate(ALL_PLATFORMS_KEY)
+
+
+def _listen(database_url, poll_timeout):
+    conn = psycopg2.connect(database_url)
+    try:
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL}")
+
+        # Anything changed while we were not listening is unknown, start clean
+        flush_all_caches()
+        print(f"Cache listener subscribed to '{CHANNEL}'")
+
+        while True:
+            if select.select([conn], [], [], poll_timeout) == ([], [], []):
+                continue
+            conn.poll()
+            while conn.notifies:
+                handle_notification(conn.notifies.pop(0).payload)
+    finally:
+        conn.close()
+
+
+def _run(database_url, poll_timeout, max_backoff):
+    backoff = 1
+    while True:
+        started = time.monotonic()
+        try:
+            _listen(database_url, poll_timeout)
+        except Exception as e:
+            print(f"Cache listener disconnected: {e}")
+
+        # Reset the backoff after a connection that lived for a while
+        if time.monotonic() - started > max_backoff:
+            backoff = 1
+        time.sleep(backoff)
+        backoff = min(backoff * 2, max_backoff)
+
+
+def start_cache_listener(database_url, poll_timeout=5, max_backoff=30):
+    """Start the background LISTEN thread once per process"""
+    global _listener_thread
+    with _listener_lock:
+        if _listener_thread is not None and _listener_thread.is_alive():
+            return _listener_thread
+        _listener_thread = threading.Thread(
+            target=_run,
+            args=(database_url, poll_timeout, max_backoff),
+            name='cache-listener',
+            daemon=True
+        )
+        _listener_thread.start()
+        return _listener_thread
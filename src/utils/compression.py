@@ -0,0 +1,96 @@
+import gzip
+import zlib
+from flask import current_app, request
+from src.utils.streaming import NDJSON_MIMETYPE
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Negotiated response compression. Buffered responses are compressed when
+# they are at least COMPRESS_MIN_SIZE bytes; streamed responses (?stream=)
+# are compressed incrementally as chunks are produced.
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    NDJSON_MIMETYPE,
+    'text/plain',
+    'text/html',
+    'text/csv'
+}
+
+
+def available_encodings():
+    """Encodings this process can produce, in order of preference"""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def choose_encoding():
+    """Pick the best encoding the client accepts, or None for identity"""
+    return request.accept_encodings.best_match(available_encodings())
+
+
+def compress_body(data, encoding):
+    config = current_app.config
+    if encoding == 'br':
+        return brotli.compress(data, quality=config['COMPRESS_BR_QUALITY'])
+    return gzip.compress(data, compresslevel=config['COMPRESS_LEVEL'], mtime=0)
+
+
+def _compress_chunks(chunks, encoding, level, quality):
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=quality)
+        compress, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        # wbits 16 + MAX_WBITS writes a gzip header and trailer
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        compress, finish = compressor.compress, compressor.flush
+        flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    # Flush after every chunk so the client can decode each one as it
+    # arrives instead of waiting for the compressor's window to fill
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        data = compress(chunk) + flush()
+        if data:
+            yield data
+    yield finish()
+
+
+def compress_response(response):
+    """after_request hook that compresses JSON and text responses"""
+    config = current_app.config
+    if not config['COMPRESS_ENABLED']:
+        return response
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    if response.status_code < 200 or response.status_code in (204, 304):
+        return response
+    if 'Content-Encoding' in response.headers or response.direct_passthrough:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_chunks(
+            response.response, encoding, config['COMPRESS_LEVEL'], config['COMPRESS_BR_QUALITY']
+        )
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < config['COMPRESS_MIN_SIZE']:
+            return response
+        response.set_data(compress_body(data, encoding))
+
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_compression(app):
+    app.after_request(compress_response)
@@ -0,0 +1,152 @@
+import functools
+import hashlib
+from flask import current_app, g, request
+from src.config.database import execute_query
+from src.utils.compression import choose_encoding
+from src.utils.multiget import get_ids_arg
+from src.utils.streaming import get_stream_mode
+
+
+# HTTP conditional GETs. A validator returns (token, last_modified): list
+# endpoints read a row_versions counter (migration 0007), single rows take the
+# version cached with their entity cache entry. The ETag hashes the token with
+# the request URL, the negotiated representation (JSON page, JSON or NDJSON
+# stream) and the encoding, so every page, ?fields= choice, representation and
+# encoding gets its own strong ETag. Matching requests get a 304 before
+# the view, and its full query, runs.
+
+def scope_version(scope):
+    """Validator from the row_versions counter of a scope.
+
+    `scope` is a string or a callable receiving the view arguments.
+    """
+    def validator(**view_args):
+        name = scope(**view_args) if callable(scope) else scope
+        rows = execute_query(
+            "SELECT version, changed_at FROM row_versions WHERE scope = %s",
+            (name,), fetch=True
+        )
+        if not rows:
+            # Nothing written in this scope since the migration
+            return f"{name}:0", None
+        return f"{name}:{rows[0]['version']}", rows[0]['changed_at']
+    return validator
+
+
+def cached_version(cache, key, load):
+    """Validator from the version (updated_at / changed_at) cached with an entry.
+
+    Answered in process while the entry is cached: the LISTEN/NOTIFY listener
+    evicts it when the row changes, so the next request misses and
+    `load(**view_args)` refills the cache. That load is the only query, and
+    the view then serves the same entry. `key` is a cache key or a callable
+    receiving the view arguments.
+    """
+    def validator(**view_args):
+        cache_key = key(**view_args) if callable(key) else key
+        version = cache.version(cache_key)
+        if version is None:
+            load(**view_args)
+            version = cache.version(cache_key)
+        if version is None:
+            # Not found (the view answers 404) or caching is disabled
+            return None, None
+        return f"{cache.name}:{cache_key}:{version.isoformat()}", version
+    return validator
+
+
+def cached_versions(cache, load, fallback):
+    """Validator for list routes that also answer ?ids=.
+
+    With ?ids= the token lists the version cached with each requested entry;
+    only the ids missing from the cache are fetched, by `load(ids)`, which
+    caches them. Views pass validated_versions() on as minimum versions, so
+    no entry older than the ETag is served. Without ?ids= `fallback` validates.
+    """
+    def validator(**view_args):
+        ids, err = get_ids_arg()
+        if err:
+            return None, None
+        if not ids:
+            return fallback(**view_args)
+
+        versions = {row_id: cache.version(row_id) for row_id in ids}
+        missing = [row_id for row_id, version in versions.items() if version is None]
+        if missing:
+            load(missing)
+            versions.update((row_id, cache.version(row_id)) for row_id in missing)
+        if any(version is None for version in versions.values()):
+            # An unknown id, or more ids than the cache holds; no ETag then
+            return None, None
+
+        g.validated_versions = versions
+        token = ','.join(f"{row_id}@{version.isoformat()}" for row_id, version in versions.items())
+        return f"{cache.name}:{token}", max(versions.values())
+    return validator
+
+
+def validated_versions():
+    """{id: version} that cached_versions() validated for this request, or None"""
+    return g.get('validated_versions')
+
+
+def validated_last_modified():
+    """Last-Modified the validator reported for this request, or None.
+
+    Views serving rows from a cache pass it as the minimum version, so a
+    body is never older than the ETag it is sent with.
+    """
+    return g.get('validated_last_modified')
+
+
+def _make_etag(token):
+    encoding = choose_encoding() if current_app.config['COMPRESS_ENABLED'] else None
+    raw = f"{token}|{request.full_path}|{get_stream_mode() or 'page'}|{encoding or 'identity'}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _is_not_modified(etag, last_modified):
+    # If-None-Match takes precedence over If-Modified-Since (RFC 9110 13.2.2)
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def _set_validators(response, etag, last_modified, cache_control):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = cache_control
+    # The body depends on Accept (NDJSON streams) and Accept-Encoding
+    response.vary.add('Accept')
+    response.vary.add('Accept-Encoding')
+
+
+def conditional(validator, cache_control='no-cache'):
+    """Decorate a GET view with ETag / Last-Modified handling and a Cache-Control header"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                token, last_modified = validator(**kwargs)
+            except Exception as e:
+                print(f"WARNING: Conditional request validator failed, serving full response. Error: {e}")
+                token, last_modified = None, None
+            g.validated_last_modified = last_modified
+            if token is None:
+                return view(*args, **kwargs)
+
+            etag = _make_etag(token)
+            if _is_not_modified(etag, last_modified):
+                response = current_app.response_class(status=304)
+                _set_validators(response, etag, last_modified, cache_control)
+                return response
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                _set_validators(response, etag, last_modified, cache_control)
+            return response
+        return wrapper
+    return decorator
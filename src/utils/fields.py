@@ -0,0 +1,40 @@
+from flask import request
+
+
+# Sparse fieldsets: ?fields=id,title,poster_file
+# Field names are checked against a per-resource whitelist before they are
+# put into a SELECT list, so they are safe to interpolate.
+
+def get_fields_arg(allowed):
+    """Parse ?fields= against the allowed columns. Returns (fields, err); fields is None when absent"""
+    raw = request.args.get('fields')
+    if raw is None:
+        return None, None
+
+    fields = list(dict.fromkeys(field.strip() for field in raw.split(',') if field.strip()))
+    if not fields:
+        return None, "fields must not be empty"
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        return None, f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(allowed)}"
+    return fields, None
+
+
+def selected_columns(fields, allowed, always=('id',)):
+    """Validated fields in column order; None selects every allowed column.
+
+    Columns in `always` (ids, pagination keys) are selected even if not requested.
+    """
+    return list(allowed) if fields is None else [column for column in allowed if column in fields or column in always]
+
+
+def select_columns(fields, allowed, always=('id',)):
+    """SQL column list for validated fields, see selected_columns"""
+    return ', '.join(selected_columns(fields, allowed, always))
+
+
+def project(row, fields, always=('id',)):
+    """Drop the keys of an already fetched row that were not requested"""
+    if fields is None:
+        return row
+    return {key: value for key, value in row.items() if key in fields or key in always}
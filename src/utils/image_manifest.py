@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import time
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+# On-disk index of IMAGES_DIR so lookups, ETags and audits don't walk or
+# hash 9k files. Written as compact JSON:
+#   {"version": 1, "generated_at": <unix time>,
+#    "files": {"<name>" or "platforms/<name>": [size, mtime_ns, width, height, sha256]}}
+MANIFEST_VERSION = 1
+PLATFORMS_SUBDIR = 'platforms'
+
+SIZE, MTIME_NS, WIDTH, HEIGHT, SHA256 = range(5)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _dimensions(path):
+    """Width and height from the image header, or (None, None) without Pillow or for non-images"""
+    if Image is None:
+        return None, None
+    try:
+        with Image.open(path) as img:
+            return img.width, img.height
+    except (OSError, ValueError):
+        return None, None
+
+
+def _scan(images_dir):
+    """Yield (relative name, DirEntry) for the image files in IMAGES_DIR and IMAGES_DIR/platforms"""
+    for prefix, directory in (('', images_dir), (PLATFORMS_SUBDIR + '/', os.path.join(images_dir, PLATFORMS_SUBDIR))):
+        if not os.path.isdir(directory):
+            continue
+        for entry in os.scandir(directory):
+            if entry.is_file() and not entry.name.startswith('.'):
+                yield prefix + entry.name, entry
+
+
+class ImageManifest:
+    """Name -> (size, mtime, dimensions, hash) index with a reverse index by hash"""
+
+    def __init__(self, files=None, generated_at=None):
+        self.files = files or {}
+        self.generated_at = generated_at
+        self._by_hash = None
+
+    @classmethod
+    def load(cls, path):
+        """Read a manifest file; a missing or unreadable one gives an empty manifest"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls()
+        if data.get('version') != MANIFEST_VERSION:
+            return cls()
+        return cls(data.get('files', {}), data.get('generated_at'))
+
+    def save(self, path):
+        """Write atomically so readers never see a half written index"""
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(
+                {'version': MANIFEST_VERSION, 'generated_at': self.generated_at, 'files': self.files},
+                f, separators=(',', ':')
+            )
+        os.replace(tmp_path, path)
+
+    def get(self, name):
+        return self.files.get(name)
+
+    def __contains__(self, name):
+        return name in self.files
+
+    def __len__(self):
+        return len(self.files)
+
+    def by_hash(self):
+        """sha256 -> [names], built on first use"""
+        if self._by_hash is None:
+            index = {}
+            for name, entry in self.files.items():
+                index.setdefault(entry[SHA256], []).append(name)
+            self._by_hash = index
+        return self._by_hash
+
+    def matches(self, name, stat):
+        """True if the indexed entry still describes the file on disk"""
+        entry = self.files.get(name)
+        return entry is not None and entry[SIZE] == stat.st_size and entry[MTIME_NS] == stat.st_mtime_ns
+
+
+def build_manifest(images_dir, previous=None):
+    """Index every image file, rehashing only files whose size or mtime changed.
+
+    Returns (manifest, counts) where counts has 'files', 'reused', 'indexed'
+    and 'removed'.
+    """
+    previous = previous or ImageManifest()
+    files = {}
+    reused = 0
+    for name, entry in _scan(images_dir):
+        stat = entry.stat()
+        if previous.matches(name, stat):
+            files[name] = previous.files[name]
+            reused += 1
+            continue
+        width, height = _dimensions(entry.path)
+        files[name] = [stat.st_size, stat.st_mtime_ns, width, height, _hash_file(entry.path)]
+
+    counts = {
+        'files': len(files),
+        'reused': reused,
+        'indexed': len(files) - reused,
+        'removed': len(set(previous.files) - set(files))
+    }
+    return ImageManifest(files, int(time.time())), counts
+
+
+def audit_manifest(manifest, movies, platforms):
+    """Compare the manifest with the image names stored in the database.
+
+    Returns {'missing': [...], 'orphans': [...], 'duplicates': [[...], ...]};
+    each missing item names the row and column that points at the absent file.
+    """
+    referenced = set()
+    missing = []
+    for movie in movies:
+        for column in ('poster_file', 'banner_file'):
+            name = movie[column]
+            if not name:
+                continue
+            referenced.add(name)
+            if name not in manifest:
+                missing.append({'table': 'movies', 'id': movie['id'], 'column': column, 'file': name})
+    for platform in platforms:
+        if not platform['logo_path']:
+            continue
+        name = PLATFORMS_SUBDIR + '/' + platform['logo_path'].lstrip('/')
+        referenced.add(name)
+        if name not in manifest:
+            missing.append({'table': 'platforms', 'id': platform['id'], 'column': 'logo_path', 'file': name})
+
+    orphans = sorted(name for name in manifest.files if name not in referenced)
+    duplicates = sorted(sorted(names) for names in manifest.by_hash().values() if len(names) > 1)
+    return {'missing': missing, 'orphans': orphans, 'duplicates': duplicates}
+
+
+# Loaded by load_image_manifest() at startup and replaced by the CLI after a rebuild
+image_manifest = ImageManifest()
+
+
+def load_image_manifest(config):
+    global image_manifest
+    image_manifest = ImageManifest.load(config['IMAGE_MANIFEST_PATH'])
+    return image_manifest
+
+
+def get_image_manifest():
+    return image_manifest
+
+
+def set_image_manifest(manifest):
+    global image_manifest
+    image_manifest = manifest
@@ -0,0 +1,270 @@
+import io
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from flask import request
+
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = None
+    features = None
+
+
+# Resized copies of the files in IMAGES_DIR, generated on first request.
+# Widths are TMDB's poster sizes; ?w= is rounded up to the next one so the
+# number of variants per image stays bounded.
+VARIANT_WIDTHS = (92, 154, 185, 342, 500, 780)
+VARIANT_PRESETS = {
+    'thumb': 92,
+    'small': 154,
+    'medium': 342,
+    'large': 780
+}
+
+# (mimetype, Pillow format, file extension, save options), best first
+VARIANT_FORMATS = (
+    ('image/avif', 'AVIF', 'avif', {'quality': 55, 'speed': 8}),
+    ('image/webp', 'WEBP', 'webp', {'quality': 80, 'method': 4}),
+)
+JPEG_FORMAT = ('image/jpeg', 'JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True})
+
+RESIZABLE_EXTENSIONS = ('jpg', 'jpeg', 'png', 'webp')
+
+
+def resizing_available():
+    return Image is not None
+
+
+def get_variant_width():
+    """Read ?w= or ?size=<preset>. Returns (width, err); width is None for the original"""
+    preset = request.args.get('size')
+    raw = request.args.get('w')
+    if preset is not None:
+        if preset not in VARIANT_PRESETS:
+            return None, f"Unknown size. Expected one of: {', '.join(VARIANT_PRESETS)}"
+        return VARIANT_PRESETS[preset], None
+    if raw is None:
+        return None, None
+    try:
+        width = int(raw)
+    except ValueError:
+        return None, "w must be an integer"
+    if width < 1:
+        return None, "w must be positive"
+    for allowed in VARIANT_WIDTHS:
+        if width <= allowed:
+            return allowed, None
+    return VARIANT_WIDTHS[-1], None
+
+
+def negotiate_format():
+    """Pick AVIF or WebP when the client lists it explicitly (a */* wildcard does not count), else JPEG"""
+    accepted = {value for value, quality in request.accept_mimetypes if quality > 0}
+    for variant_format in VARIANT_FORMATS:
+        mimetype, pil_format = variant_format[0], variant_format[1]
+        if mimetype in accepted and features.check(pil_format.lower()):
+            return variant_format
+    return JPEG_FORMAT
+
+
+def render_variant(source_path, width, variant_format):
+    """Resize an image to `width` (never upscaling) and encode it. Returns the encoded bytes"""
+    _, pil_format, _, options = variant_format
+    with Image.open(source_path) as img:
+        if img.width <= width and img.format == pil_format:
+            # Already small enough; re-encoding would only lose quality
+            with open(source_path, 'rb') as f:
+                return f.read()
+        # Let the JPEG decoder skip detail we are about to throw away
+        img.draft('RGB', (width, width * 4))
+        if img.width > width:
+            height = max(1, round(img.height * width / img.width))
+            img = img.resize((width, height), Image.LANCZOS)
+        if pil_format == 'JPEG' and img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+        out = io.BytesIO()
+        img.save(out, format=pil_format, **options)
+        return out.getvalue()
+
+
+class VariantCache:
+    """Disk cache of rendered variants, bounded by total bytes and evicted LRU.
+
+    get_or_create() lets one thread render a missing variant while other
+    requests for the same key wait for it, so a burst of requests for an
+    uncached thumbnail renders it once. Files are written to a temp name and
+    renamed into place, so other processes sharing the directory never read
+    a partial file. The LRU index is per process; a file evicted by another
+    process is simply rendered again.
+
+    A returned path stays pinned until release(), so eviction can't delete
+    it before the caller has opened it.
+    """
+
+    def __init__(self, directory=None, max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> size, least recently used first
+        self._bytes = 0
+        self._key_locks = {}            # key -> [lock, waiters]
+        self._pins = {}                 # key -> callers yet to open the file
+        self.hits = 0
+        self.misses = 0
+        self.renders = 0
+        self.evictions = 0
+        self.uncached = 0
+
+    def configure(self, directory, max_bytes):
+        """Point the cache at a directory and index the variants already in it"""
+        os.makedirs(directory, exist_ok=True)
+        existing = []
+        for entry in os.scandir(directory):
+            if entry.is_file() and not entry.name.startswith('.'):
+                stat = entry.stat()
+                existing.append((stat.st_atime, entry.name, stat.st_size))
+        existing.sort()
+
+        with self._lock:
+            self.directory = directory
+            self.max_bytes = max_bytes
+            self._entries = OrderedDict((name, size) for _, name, size in existing)
+            self._bytes = sum(self._entries.values())
+            self._evict_overflow()
+
+    def path_for(self, key):
+        return os.path.join(self.directory, key)
+
+    def _pin(self, key):
+        self._pins[key] = self._pins.get(key, 0) + 1
+
+    def release(self, key):
+        """Unpin a path returned by get_or_create() once the caller has opened it"""
+        with self._lock:
+            self._pins[key] -= 1
+            if self._pins[key] == 0:
+                del self._pins[key]
+                self._evict_overflow()
+
+    def _lookup(self, key):
+        path = self.path_for(key)
+        with self._lock:
+            if key in self._entries:
+                if os.path.exists(path):
+                    self._entries.move_to_end(key)
+                    self._pin(key)
+                    self.hits += 1
+                    return path
+                self._bytes -= self._entries.pop(key)
+        # Rendered by another process
+        if os.path.exists(path):
+            self._add(key, os.path.getsize(path))
+            with self._lock:
+                self.hits += 1
+            return path
+        return None
+
+    def _add(self, key, size):
+        """Index a file on disk and return it pinned"""
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)
+            self._entries[key] = size
+            self._bytes += size
+            self._pin(key)
+            self._evict_overflow()
+
+    def _store(self, key, data):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.path_for(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._add(key, len(data))
+        return self.path_for(key)
+
+    def get_or_create(self, key, render):
+        """Return (path, None) for a cached variant, calling render() to create it if missing.
+
+        The path is pinned; call release(key) when done with it. A variant
+        larger than the whole budget isn't written and comes back as (None, data).
+        """
+        path = self._lookup(key)
+        if path is not None:
+            return path, None
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            key_lock[1] += 1
+        try:
+            with key_lock[0]:
+                # Another request may have rendered it while we waited
+                path = self._lookup(key)
+                if path is not None:
+                    return path, None
+                with self._lock:
+                    self.misses += 1
+                    self.renders += 1
+                data = render()
+                if len(data) > self.max_bytes:
+                    with self._lock:
+                        self.uncached += 1
+                    return None, data
+                return self._store(key, data), None
+        finally:
+            with self._lock:
+                key_lock[1] -= 1
+                if key_lock[1] == 0:
+                    del self._key_locks[key]
+
+    def _evict_overflow(self):
+        """Drop least recently used files until under budget; pinned files are skipped"""
+        if self._bytes <= self.max_bytes:
+            return
+        for key in [key for key in self._entries if key not in self._pins]:
+            if self._bytes <= self.max_bytes:
+                break
+            self._bytes -= self._entries.pop(key)
+            self.evictions += 1
+            try:
+                os.remove(self.path_for(key))
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': resizing_available(),
+                'files': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'renders': self.renders,
+                'evictions': self.evictions,
+                'uncached': self.uncached,
+                'in_flight': len(self._key_locks),
+                'pinned': len(self._pins)
+            }
+
+
+variant_cache = VariantCache()
+
+
+def configure_variant_cache(config):
+    """Apply IMAGE_VARIANT_* settings from the Flask config"""
+    variant_cache.configure(config['IMAGE_VARIANT_DIR'], config['IMAGE_VARIANT_MAX_BYTES'])
+
+
+def variant_key(name, subdir, source_stat, width, extension):
+    """Cache file name of a variant; the source mtime makes replaced files miss"""
+    stem = name.rsplit('.', 1)[0]
+    prefix = f"{subdir}-" if subdir else ''
+    return f"{prefix}{stem}-w{width}-{source_stat.st_mtime_ns}.{extension}"
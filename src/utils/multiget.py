@@ -0,0 +1,38 @@
+from flask import current_app, request
+
+
+# Helpers for ?ids=1,2,3 multi-get on list endpoints
+
+def get_ids_arg():
+    """Parse ?ids= into a list of unique ints in request order.
+
+    Returns (ids, err); ids is None when the parameter is absent.
+    """
+    raw = request.args.get('ids')
+    if raw is None:
+        return None, None
+
+    ids = []
+    try:
+        for part in raw.split(','):
+            if part.strip():
+                ids.append(int(part))
+    except ValueError:
+        return None, "ids must be a comma separated list of integers"
+    ids = list(dict.fromkeys(ids))
+
+    if not ids:
+        return None, "ids must not be empty"
+    max_ids = current_app.config['PAGE_SIZE_MAX']
+    if len(ids) > max_ids:
+        return None, f"At most {max_ids} ids per request"
+    return ids, None
+
+
+def order_by_ids(rows, ids, key='id'):
+    """Arrange rows in the order of ids and list the ids that were not found"""
+    by_id = {row[key]: row for row in rows}
+    return {
+        'items': [by_id[row_id] for row_id in ids if row_id in by_id],
+        'missing': [row_id for row_id in ids if row_id not in by_id]
+    }
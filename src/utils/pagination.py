@@ -0,0 +1,81 @@
+import base64
+import json
+from datetime import datetime
+from flask import current_app, request
+
+
+# Keyset (cursor) pagination helpers.
+# A cursor is the ORDER BY key of the last row of a page, JSON encoded and
+# base64url wrapped so clients treat it as an opaque string.
+
+def encode_cursor(values):
+    """Encode the ORDER BY key values of a row into an opaque cursor"""
+    raw = json.dumps(list(values), default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _cursor_value(value, kind):
+    """Check one decoded key value against the type of its sort column"""
+    if kind is int:
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+    elif kind is float:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return float(value)
+    elif kind is datetime:
+        if isinstance(value, str):
+            return datetime.fromisoformat(value)
+    elif isinstance(value, kind):
+        return value
+    raise ValueError("Invalid cursor")
+
+
+def decode_cursor(cursor, key_types):
+    """Decode a cursor back into one value per sort key, checked against `key_types`"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(key_types):
+        raise ValueError("Invalid cursor")
+    return [_cursor_value(value, kind) for value, kind in zip(values, key_types)]
+
+
+def get_page_args(key_types):
+    """Read ?limit= and ?cursor= from the request.
+
+    `key_types` gives the type of each ORDER BY key, e.g. (str, int) or
+    (datetime, int), so a tampered cursor is a 400 rather than a SQL error.
+
+    Returns (limit, cursor_values, err). cursor_values is None on the first page.
+    """
+    default_size = current_app.config['PAGE_SIZE_DEFAULT']
+    max_size = current_app.config['PAGE_SIZE_MAX']
+
+    try:
+        limit = int(request.args.get('limit', default_size))
+    except ValueError:
+        return None, None, "limit must be an integer"
+    if limit < 1:
+        return None, None, "limit must be positive"
+    limit = min(limit, max_size)
+
+    cursor = request.args.get('cursor')
+    if not cursor:
+        return limit, None, None
+    try:
+        return limit, decode_cursor(cursor, key_types), None
+    except ValueError as e:
+        return None, None, str(e)
+
+
+def build_page(rows, limit, key_columns):
+    """Trim a `limit + 1` result set to one page and compute the next cursor"""
+    rows = list(rows)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last[column] for column in key_columns)
+    return {'items': rows, 'next': next_cursor}
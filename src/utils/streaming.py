@@ -0,0 +1,75 @@
+from flask import Response, current_app, request, stream_with_context
+
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+# Serialized rows are joined into chunks of about this size before they are
+# written, instead of handing the server (and the compressor) one row at a time
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def get_stream_mode():
+    """Return 'ndjson', 'json' or None depending on ?stream= and the Accept header"""
+    mode = request.args.get('stream')
+    if mode in ('ndjson', 'json'):
+        return mode
+    if mode in ('1', 'true'):
+        return 'json'
+    if request.accept_mimetypes.best == NDJSON_MIMETYPE:
+        return 'ndjson'
+    return None
+
+
+def _chunked(parts):
+    buffer = []
+    size = 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= STREAM_CHUNK_SIZE:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def _ndjson_chunks(rows):
+    dumps = current_app.json.dumps
+    try:
+        for row in rows:
+            yield dumps(row) + '\n'
+    except Exception as e:
+        print(f"Stream aborted: {e}")
+        yield dumps({'error': 'stream aborted'}) + '\n'
+
+
+def _json_array_chunks(rows):
+    dumps = current_app.json.dumps
+    yield '['
+    first = True
+    try:
+        for row in rows:
+            if first:
+                yield dumps(row)
+                first = False
+            else:
+                yield ',' + dumps(row)
+    except Exception as e:
+        print(f"Stream aborted: {e}")
+        # The array is left unterminated so the body never parses as a complete result
+        yield ('' if first else ',') + dumps({'error': 'stream aborted'})
+        return
+    yield ']'
+
+
+def stream_rows(rows, mode):
+    """Build a chunked response that serializes rows one at a time.
+
+    The status line is already sent when rows are serialized, so a failure
+    mid-stream ends the body with an {"error": ...} marker: a final NDJSON
+    line, or a last array element with the JSON array left unclosed.
+    """
+    if mode == 'ndjson':
+        return Response(stream_with_context(_chunked(_ndjson_chunks(rows))), mimetype=NDJSON_MIMETYPE)
+    return Response(stream_with_context(_chunked(_json_array_chunks(rows))), mimetype='application/json')
@@ -0,0 +1,227 @@
+import atexit
+import threading
+import time
+from collections import OrderedDict
+from psycopg2.extras import RealDictCursor, execute_values
+
+
+class CommentVoteBuffer:
+    """Coalesces comment like/dislike increments in memory.
+
+    vote() only records the increment. A background thread writes all pending
+    increments with one batched UPDATE every `flush_interval` seconds, or
+    sooner once `max_events` increments are pending, and once more at exit.
+
+    The buffer also keeps the last committed row of recently voted comments,
+    refreshed from each flush, so a vote is answered from memory without a
+    database round trip.
+    """
+
+    def __init__(self, db_pool, flush_interval=0.2, max_events=500, max_rows=10000, row_ttl=30.0):
+        self.db_pool = db_pool
+        self.flush_interval = flush_interval
+        self.max_events = max_events
+        self.max_rows = max_rows
+        self.row_ttl = row_ttl
+
+        self._cond = threading.Condition()
+        self._pending = {}      # comment_id -> [likes, dislikes]
+        self._inflight = {}     # comment_id -> [likes, dislikes] being written by flush()
+        self._rows = OrderedDict()  # comment_id -> (committed row, loaded_at)
+        self._events = 0
+        self._stopped = False
+        self._thread = None
+        # Held while a flush commits and while a row is loaded, so a loaded
+        # row never misses (or double counts) a batch committed meanwhile
+        self._flush_lock = threading.Lock()
+
+        self.flushes = 0
+        self.flushed_events = 0
+        self.failed_flushes = 0
+        self.row_hits = 0
+        self.row_loads = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='comment-vote-flusher', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Stop the flusher thread and write whatever is still pending"""
+        with self._cond:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def vote(self, comment_id, load, likes=0, dislikes=0):
+        """Record an increment and return the comment with its projected counts.
+
+        `load(comment_id)` reads the committed row and is only called when
+        the row isn't cached; returns None (recording nothing) if it finds none.
+        """
+        with self._cond:
+            row = self._cached_row(comment_id)
+            if row is not None:
+                self.row_hits += 1
+                self._add(comment_id, likes, dislikes)
+                return self._project(comment_id, row)
+
+        with self._flush_lock:
+            row = load(comment_id)
+            if row is None:
+                return None
+            with self._cond:
+                self._store_row(comment_id, row)
+                self.row_loads += 1
+                self._add(comment_id, likes, dislikes)
+                return self._project(comment_id, row)
+
+    def forget(self, comment_id):
+        """Drop the cached row, e.g. after the comment was edited or deleted"""
+        with self._cond:
+            self._rows.pop(comment_id, None)
+
+    def _cached_row(self, comment_id):
+        entry = self._rows.get(comment_id)
+        if entry is None:
+            return None
+        row, loaded_at = entry
+        if time.monotonic() - loaded_at > self.row_ttl:
+            del self._rows[comment_id]
+            return None
+        self._rows.move_to_end(comment_id)
+        return row
+
+    def _store_row(self, comment_id, row):
+        self._rows[comment_id] = (row, time.monotonic())
+        self._rows.move_to_end(comment_id)
+        while len(self._rows) > self.max_rows:
+            self._rows.popitem(last=False)
+
+    def _add(self, comment_id, likes, dislikes):
+        pending = self._pending.setdefault(comment_id, [0, 0])
+        pending[0] += likes
+        pending[1] += dislikes
+        self._events += 1
+        if self._events >= self.max_events:
+            self._cond.notify()
+
+    def _project(self, comment_id, row):
+        """Committed counts plus the increments not yet committed; caller holds the lock"""
+        projected = dict(row)
+        likes = projected.get('comment_likes') or 0
+        dislikes = projected.get('comment_dislikes') or 0
+        for deltas in (self._inflight.get(comment_id), self._pending.get(comment_id)):
+            if deltas:
+                likes += deltas[0]
+                dislikes += deltas[1]
+        projected['comment_likes'] = likes
+        projected['comment_dislikes'] = dislikes
+        return projected
+
+    def flush(self):
+        """Write all pending increments in one UPDATE; they are kept for retry on failure"""
+        with self._flush_lock:
+            with self._cond:
+                batch = self._pending
+                events = self._events
+                self._pending = {}
+                self._events = 0
+                self._inflight = batch
+            if not batch:
+                return 0
+
+            conn = None
+            try:
+                conn = self.db_pool.getconn()
+                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                    rows = execute_values(
+                        cursor,
+                        """
+                        UPDATE comments
+                        SET comment_likes = COALESCE(comments.comment_likes, 0) + delta.likes,
+                            comment_dislikes = COALESCE(comments.comment_dislikes, 0) + delta.dislikes
+                        FROM (VALUES %s) AS delta(id, likes, dislikes)
+                        WHERE comments.id = delta.id
+                        RETURNING comments.*
+                        """,
+                        # Sorted so concurrent flushes from other workers lock rows in the same order
+                        sorted((comment_id, likes, dislikes) for comment_id, (likes, dislikes) in batch.items()),
+                        fetch=True
+                    )
+                conn.commit()
+            except Exception as e:
+                if conn is not None:
+                    conn.rollback()
+                print(f"WARNING: Failed to flush {events} comment votes, will retry. Error: {e}")
+                with self._cond:
+                    self._inflight = {}
+                    for comment_id, (likes, dislikes) in batch.items():
+                        pending = self._pending.setdefault(comment_id, [0, 0])
+                        pending[0] += likes
+                        pending[1] += dislikes
+                    self._events += events
+                    self.failed_flushes += 1
+                return 0
+            finally:
+                if conn is not None:
+                    self.db_pool.putconn(conn)
+
+            with self._cond:
+                self._inflight = {}
+                for row in rows:
+                    if row['id'] in self._rows:
+                        self._store_row(row['id'], row)
+                self.flushes += 1
+                self.flushed_events += events
+            return events
+
+    def _run(self):
+        while True:
+            deadline = time.monotonic() + self.flush_interval
+            with self._cond:
+                while not self._stopped and self._events < self.max_events:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._stopped:
+                    return
+            self.flush()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'pending_comments': len(self._pending),
+                'pending_events': self._events,
+                'cached_rows': len(self._rows),
+                'row_hits': self.row_hits,
+                'row_loads': self.row_loads,
+                'flushes': self.flushes,
+                'flushed_events': self.flushed_events,
+                'failed_flushes': self.failed_flushes
+            }
+
+
+# Set by start_comment_vote_buffer() when COMMENT_VOTE_COALESCING is enabled
+comment_vote_buffer = None
+
+
+def start_comment_vote_buffer(app):
+    global comment_vote_buffer
+    if comment_vote_buffer is None:
+        comment_vote_buffer = CommentVoteBuffer(
+            app.db_pool,
+            flush_interval=app.config['COMMENT_VOTE_FLUSH_MS'] / 1000,
+            max_events=app.config['COMMENT_VOTE_FLUSH_EVENTS']
+        )
+        comment_vote_buffer.start()
+    return comment_vote_buffer
+
+
+def get_comment_vote_buffer():
+    return comment_vote_buffer